@@ -2,6 +2,7 @@ import os
 import logging
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import JSON, inspect, text
 from sqlalchemy.orm import DeclarativeBase
 from werkzeug.middleware.proxy_fix import ProxyFix
 
@@ -28,7 +29,12 @@ if database_url:
     if database_url.startswith("postgres://"):
         database_url = database_url.replace("postgres://", "postgresql://", 1)
     app.config["SQLALCHEMY_DATABASE_URI"] = database_url
+    # Sized for the gunicorn request threads plus the queue's worker threads
     app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        "pool_size": 10,
+        "max_overflow": 20,
+        "pool_timeout": 30,
+        "pool_use_lifo": True,  # Reuse the most recent connection so idle extras can time out
         "pool_recycle": 300,
         "pool_pre_ping": True,
         "connect_args": {"connect_timeout": 10}
@@ -45,8 +51,15 @@ else:
 app.config["UPLOAD_FOLDER"] = os.path.join('/tmp', 'uploads')
 app.config["PROCESSED_FOLDER"] = os.path.join('/tmp', 'processed')
 app.config["TEMP_FOLDER"] = os.path.join('/tmp', 'temp')
+app.config["PREVIEW_FOLDER"] = os.path.join('/tmp', 'previews')  # Rendered preview cache
 app.config["MAX_CONTENT_LENGTH"] = 100 * 1024 * 1024  # 100MB max file size
 
+# Download offloading to the front proxy (both off by default for local development)
+# X_ACCEL_REDIRECT_PREFIX: nginx internal location mapped to PROCESSED_FOLDER, e.g. /_internal/processed
+# USE_X_SENDFILE: let Apache/lighttpd serve files passed to send_file
+app.config["X_ACCEL_REDIRECT_PREFIX"] = os.environ.get("X_ACCEL_REDIRECT_PREFIX")
+app.config["USE_X_SENDFILE"] = os.environ.get("USE_X_SENDFILE", "").lower() in ("1", "true")
+
 # Free vs Premium tier limits
 app.config["FREE_USER_FILE_LIMIT"] = 5 * 1024 * 1024  # 5MB per file
 app.config["FREE_USER_BATCH_LIMIT"] = 3  # 3 files per batch
@@ -59,7 +72,8 @@ def create_directories():
     directories = [
         app.config["UPLOAD_FOLDER"],
         app.config["PROCESSED_FOLDER"],
-        app.config["TEMP_FOLDER"]
+        app.config["TEMP_FOLDER"],
+        app.config["PREVIEW_FOLDER"]
     ]
     for directory in directories:
         try:
@@ -69,6 +83,41 @@ def create_directories():
 
 create_directories()
 
+def upgrade_schema():
+    """Add model columns and indexes missing from, and convert JSON columns in, tables created by an older version"""
+    from models import NativeJSON
+    inspector = inspect(db.engine)
+    preparer = db.engine.dialect.identifier_preparer
+    is_postgres = db.engine.dialect.name == 'postgresql'
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column['name']: column['type'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    # JSON columns used to be Text holding JSON strings; convert them to JSONB
+                    if is_postgres and isinstance(column.type, NativeJSON) and not isinstance(existing[column.name], JSON):
+                        name = preparer.format_column(column)
+                        conn.execute(text(f"ALTER TABLE {preparer.format_table(table)} ALTER COLUMN {name} TYPE JSONB USING NULLIF({name}, '')::jsonb"))
+                        logging.info(f"Converted column {table.name}.{column.name} to JSONB")
+                    continue
+                if not column.nullable:
+                    logging.warning(f"Cannot add required column {table.name}.{column.name} automatically")
+                    continue
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                conn.execute(text(f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {preparer.format_column(column)} {column_type}"))
+                existing[column.name] = column.type
+                logging.info(f"Added column {table.name}.{column.name}")
+            
+            # Indexes declared on the models after the table was created
+            existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in existing_indexes or not all(column.name in existing for column in index.columns):
+                    continue
+                index.create(conn, checkfirst=True)
+                logging.info(f"Created index {index.name}")
+
 # Initialize database
 db.init_app(app)
 
@@ -84,15 +133,23 @@ with app.app_context():
     except Exception as e:
         logging.error(f"Error creating database tables: {e}")
     
+    # create_all never alters existing tables, so bring older schemas up to date
+    try:
+        upgrade_schema()
+    except Exception as e:
+        logging.error(f"Error upgrading database schema: {e}")
+    
     # Ensure directories exist
     create_directories()
     
     # Cleanup old files on startup (skip on Vercel to avoid cold start overhead)
     if not IS_VERCEL:
         try:
-            from utils import cleanup_old_files
+            from utils import cleanup_old_files, expire_subscriptions
+            expire_subscriptions()
             cleanup_old_files(app.config['UPLOAD_FOLDER'], max_age_hours=24)
             cleanup_old_files(app.config['PROCESSED_FOLDER'], max_age_hours=24)
+            cleanup_old_files(app.config['PREVIEW_FOLDER'], max_age_hours=24)
             logging.info("Cleanup of old files completed")
         except Exception as e:
             logging.warning(f"Cleanup encountered an error: {e}")
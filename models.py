@@ -1,11 +1,34 @@
+import json
 from datetime import datetime
 from enum import Enum
 from app import db
 from flask_dance.consumer.storage.sqla import OAuthConsumerMixin
 from flask_login import UserMixin
-from sqlalchemy import UniqueConstraint, Text
+from sqlalchemy import UniqueConstraint, Text, JSON
+from sqlalchemy.types import TypeDecorator
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import deferred
 from werkzeug.security import generate_password_hash, check_password_hash
 
+class NativeJSON(TypeDecorator):
+    """Native JSON column: JSONB on PostgreSQL, generic JSON elsewhere (SQLite in development)"""
+    impl = JSON
+    cache_ok = True
+    
+    def load_dialect_impl(self, dialect):
+        if dialect.name == 'postgresql':
+            return dialect.type_descriptor(JSONB())
+        return dialect.type_descriptor(JSON())
+    
+    def process_result_value(self, value, dialect):
+        # Columns not yet converted from the old Text type come back as JSON strings
+        if isinstance(value, str):
+            try:
+                return json.loads(value)
+            except ValueError:
+                return value
+        return value
+
 class JobStatus(Enum):
     PENDING = "pending"
     PROCESSING = "processing"
@@ -65,7 +88,7 @@ class User(UserMixin, db.Model):
     email = db.Column(db.String, unique=True, nullable=False)
     first_name = db.Column(db.String, nullable=False)
     last_name = db.Column(db.String, nullable=False)
-    password_hash = db.Column(db.String(256), nullable=True)  # For custom auth
+    password_hash = deferred(db.Column(db.String(256), nullable=True))  # For custom auth; only loaded when checked or set
     profile_image_url = db.Column(db.String, nullable=True)
     is_premium = db.Column(db.Boolean, default=False)
     
@@ -88,15 +111,13 @@ class User(UserMixin, db.Model):
         return str(self.id)
     
     def has_active_subscription(self):
-        """Check if user has an active premium subscription"""
-        if self.is_premium:
-            return True
+        """Check if user has an active premium subscription.
         
-        subs = db.session.query(Subscription).filter_by(user_id=self.id).all()
-        for subscription in subs:
-            if subscription.is_active():
-                return True
-        return False
+        Reads the materialized is_premium flag only; it is set when a subscription
+        is activated and cleared by utils.expire_subscriptions, which runs at
+        startup and then every few minutes from a before_request hook.
+        """
+        return bool(self.is_premium)
     
     def get_active_subscription(self):
         """Get the user's active subscription if any"""
@@ -127,9 +148,9 @@ class ProcessingJob(db.Model):
     job_type = db.Column(db.Enum(JobType), nullable=False)
     status = db.Column(db.Enum(JobStatus), default=JobStatus.PENDING)
     
-    # File information
-    input_files = db.Column(Text)  # JSON string of input file paths
-    output_files = db.Column(Text)  # JSON string of output file paths
+    # File information (JSONB on PostgreSQL, so the driver hands back Python lists)
+    input_files = db.Column(NativeJSON())  # List of input file paths
+    output_files = db.Column(NativeJSON())  # List of output file paths
     
     # Progress tracking
     progress = db.Column(db.Integer, default=0)  # 0-100
@@ -145,18 +166,29 @@ class ProcessingJob(db.Model):
     completed_at = db.Column(db.DateTime)
     
     # Settings for specific job types
-    settings = db.Column(Text)  # JSON string for job-specific settings
+    settings = db.Column(NativeJSON())  # Job-specific settings dict
+    
+    # Recent-jobs listing (newest first) and pending/processing lookups per user
+    __table_args__ = (
+        db.Index('ix_processing_jobs_user_created', user_id, created_at.desc()),
+        db.Index('ix_processing_jobs_user_status', user_id, status),
+    )
 
 class FileUpload(db.Model):
     __tablename__ = 'file_uploads'
     
     id = db.Column(db.String, primary_key=True)
-    user_id = db.Column(db.String, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.String, db.ForeignKey('users.id'), nullable=False, index=True)
     original_filename = db.Column(db.String, nullable=False)
     stored_filename = db.Column(db.String, nullable=False)
     file_size = db.Column(db.Integer, nullable=False)
     file_path = db.Column(db.String, nullable=False)
     
+    # PDF details, filled in by the background metadata task after upload
+    page_count = db.Column(db.Integer, nullable=True)
+    is_encrypted = db.Column(db.Boolean, nullable=True)
+    pdf_metadata = db.Column(NativeJSON(), nullable=True)
+    
     created_at = db.Column(db.DateTime, default=datetime.now)
     
     # Relationship with user
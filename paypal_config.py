@@ -1,47 +1,82 @@
 import os
+import threading
+from functools import lru_cache
 import paypalrestsdk
 from datetime import datetime, timedelta
 
+_paypal_configured = False
+_paypal_configure_lock = threading.Lock()
+
 # PayPal configuration
 def configure_paypal():
-    """Configure PayPal SDK"""
-    paypalrestsdk.configure({
-        "mode": "sandbox",  # Change to "live" for production
-        "client_id": os.environ.get('PAYPAL_CLIENT_ID'),
-        "client_secret": os.environ.get('PAYPAL_CLIENT_SECRET')
-    })
+    """Configure PayPal SDK once per process.
+    
+    Reconfiguring replaces the SDK's default API object and throws away its
+    cached OAuth token, forcing a token request before the next call.
+    """
+    global _paypal_configured
+    if _paypal_configured:
+        return
+    with _paypal_configure_lock:
+        if _paypal_configured:
+            return
+        paypalrestsdk.configure({
+            "mode": "sandbox",  # Change to "live" for production
+            "client_id": os.environ.get('PAYPAL_CLIENT_ID'),
+            "client_secret": os.environ.get('PAYPAL_CLIENT_SECRET')
+        })
+        _paypal_configured = True
 
 # Subscription plans
 PREMIUM_PLAN_ID = "PREMIUM_MONTHLY"  # You'll need to create this in PayPal dashboard
 
+# Static part of the subscription plan; only the redirect URLs vary per call
+PLAN_TEMPLATE = {
+    "name": "PDF Tools Premium Monthly",
+    "description": "Unlimited PDF processing with premium features",
+    "type": "INFINITE",
+    "payment_definitions": [{
+        "name": "Premium Monthly Payment",
+        "type": "REGULAR",
+        "frequency": "MONTH",
+        "frequency_interval": "1",
+        "amount": {
+            "value": "9.99",
+            "currency": "USD"
+        },
+        "cycles": "0"  # Infinite
+    }],
+    "merchant_preferences": {
+        "setup_fee": {
+            "value": "0",
+            "currency": "USD"
+        },
+        "auto_bill_amount": "YES",
+        "initial_fail_amount_action": "CONTINUE",
+        "max_fail_attempts": "3"
+    }
+}
+
+AGREEMENT_TEMPLATE = {
+    "name": "PDF Tools Premium Subscription",
+    "description": "Monthly subscription for unlimited PDF processing",
+}
+
+@lru_cache(maxsize=8)
+def get_redirect_urls(domain):
+    """Return the PayPal return/cancel URLs for a domain"""
+    return {
+        "return_url": f"{domain}/subscription/success",
+        "cancel_url": f"{domain}/subscription/cancel",
+    }
+
 def create_subscription_plan():
     """Create a subscription plan in PayPal (run this once to set up)"""
+    configure_paypal()
+    domain = os.environ.get('REPLIT_DEV_DOMAIN', 'localhost:5000')
     plan = paypalrestsdk.Plan({
-        "name": "PDF Tools Premium Monthly",
-        "description": "Unlimited PDF processing with premium features",
-        "type": "INFINITE",
-        "payment_definitions": [{
-            "name": "Premium Monthly Payment",
-            "type": "REGULAR",
-            "frequency": "MONTH",
-            "frequency_interval": "1",
-            "amount": {
-                "value": "9.99",
-                "currency": "USD"
-            },
-            "cycles": "0"  # Infinite
-        }],
-        "merchant_preferences": {
-            "setup_fee": {
-                "value": "0",
-                "currency": "USD"
-            },
-            "return_url": f"{os.environ.get('REPLIT_DEV_DOMAIN', 'localhost:5000')}/subscription/success",
-            "cancel_url": f"{os.environ.get('REPLIT_DEV_DOMAIN', 'localhost:5000')}/subscription/cancel",
-            "auto_bill_amount": "YES",
-            "initial_fail_amount_action": "CONTINUE",
-            "max_fail_attempts": "3"
-        }
+        **PLAN_TEMPLATE,
+        "merchant_preferences": PLAN_TEMPLATE["merchant_preferences"] | get_redirect_urls(domain)
     })
     
     if plan.create():
@@ -53,9 +88,9 @@ def create_subscription_plan():
 
 def create_subscription_agreement(plan_id, user_email, user_name):
     """Create a subscription agreement"""
+    configure_paypal()
     agreement = paypalrestsdk.Agreement({
-        "name": "PDF Tools Premium Subscription",
-        "description": "Monthly subscription for unlimited PDF processing",
+        **AGREEMENT_TEMPLATE,
         "start_date": (datetime.now() + timedelta(minutes=1)).isoformat() + "Z",
         "plan": {
             "id": plan_id
@@ -76,6 +111,7 @@ def create_subscription_agreement(plan_id, user_email, user_name):
 
 def execute_subscription_agreement(token):
     """Execute the subscription agreement after user approval"""
+    configure_paypal()
     agreement = paypalrestsdk.Agreement.find(token)
     if agreement.execute({"payer_id": token}):
         return agreement
@@ -85,6 +121,7 @@ def execute_subscription_agreement(token):
 
 def cancel_subscription(agreement_id, reason="User requested cancellation"):
     """Cancel a subscription"""
+    configure_paypal()
     agreement = paypalrestsdk.Agreement.find(agreement_id)
     cancel_note = {
         "cancel_note": reason
@@ -98,6 +135,7 @@ def cancel_subscription(agreement_id, reason="User requested cancellation"):
 
 def get_subscription_details(agreement_id):
     """Get subscription details"""
+    configure_paypal()
     try:
         agreement = paypalrestsdk.Agreement.find(agreement_id)
         return agreement
@@ -1,39 +1,147 @@
 import os
-import json
+import re
+import bisect
+import time
+import uuid
+import queue
 import logging
+import threading
 import zipfile
 from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from PyPDF2 import PdfReader, PdfWriter
+from html.parser import HTMLParser
+from sqlalchemy import select
+from werkzeug.utils import secure_filename
 from PIL import Image
 import pytesseract
 from docx import Document
 import openpyxl
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
-from app import db
-from models import ProcessingJob, JobStatus, JobType, get_now
+from reportlab.pdfbase import pdfmetrics
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+from app import app, db
+from models import ProcessingJob, FileUpload, JobStatus, JobType, get_now
 from utils import generate_unique_filename
 
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+try:
+    from pptx import Presentation
+    from pptx.util import Inches
+except ImportError:
+    Presentation = None
+    Inches = None
+
 logger = logging.getLogger(__name__)
 
+# Load the standard font metrics used by the overlays once, at import time
+for _font_name in ("Helvetica", "Helvetica-Bold"):
+    pdfmetrics.getFont(_font_name)
+
+# Write buffer for serialized PDFs; PdfWriter emits many small writes per object
+PDF_WRITE_BUFFER_SIZE = 1 << 20
+
+def _open_buffered(path):
+    """Open path for binary writing with a large write buffer"""
+    return open(path, 'wb', buffering=PDF_WRITE_BUFFER_SIZE)
+
+def _write_bytes(path, data):
+    """Write a bytes payload to path"""
+    with open(path, 'wb') as f:
+        f.write(data)
+
+class _HTMLTextExtractor(HTMLParser):
+    """Collect the non-empty text nodes of an HTML document"""
+    def __init__(self):
+        super().__init__()
+        self.text = []
+    def handle_data(self, data):
+        if data.strip():
+            self.text.append(data.strip())
+
 class PDFProcessor:
-    def __init__(self, job_id):
+    def __init__(self, job_id, on_update=None):
         self.job_id = job_id
-        self.job = ProcessingJob.query.get(job_id)
+        # Called with the job's status dict after every committed change
+        self.on_update = on_update
+        self.job = db.session.get(ProcessingJob, job_id)
         if not self.job:
             raise ValueError(f"Job {job_id} not found")
         
         # Unique output directory for this job
         self.output_dir = os.path.join(app.config['PROCESSED_FOLDER'], str(self.job.user_id), str(self.job_id))
         os.makedirs(self.output_dir, exist_ok=True)
+        
+        # Progress commit throttling state
+        self._last_progress = -100
+        self._last_commit_ts = 0.0
+        
+        # Parsed job JSON, filled lazily
+        self._input_files = None
+        self._settings = None
+        self._output_stems = None
+    
+    @property
+    def input_files(self):
+        """Input file paths of the job"""
+        if self._input_files is None:
+            self._input_files = self.job.input_files or []
+        return self._input_files
+    
+    @property
+    def settings(self):
+        """Job-specific settings"""
+        if self._settings is None:
+            self._settings = self.job.settings or {}
+        return self._settings
+    
+    def output_stem(self, file_path):
+        """Base name for outputs of an input file, taken from its original upload name"""
+        if self._output_stems is None:
+            # Uploads are stored under opaque names; outputs should carry the name the user knows
+            rows = db.session.execute(
+                select(FileUpload.file_path, FileUpload.original_filename)
+                .where(FileUpload.file_path.in_(self.input_files))
+            ).all() if self.input_files else []
+            original_names = dict(rows)
+            self._output_stems = {}
+            used = set()
+            for path in self.input_files:
+                stem = os.path.splitext(secure_filename(original_names.get(path) or '') or os.path.basename(path))[0]
+                # Inputs sharing a name must still get distinct outputs
+                unique_stem, n = stem, 1
+                while unique_stem in used:
+                    n += 1
+                    unique_stem = f"{stem}_{n}"
+                used.add(unique_stem)
+                self._output_stems[path] = unique_stem
+        return self._output_stems.get(file_path) or os.path.splitext(os.path.basename(file_path))[0]
+    
+    # Minimum progress delta (percent) / interval (seconds) between progress commits
+    PROGRESS_COMMIT_STEP = 2
+    PROGRESS_COMMIT_INTERVAL = 0.5
     
     def update_progress(self, progress, processed_files=None):
-        """Update job progress in database"""
+        """Update job progress, committing only on meaningful change or after an interval"""
         self.job.progress = progress
         if processed_files is not None:
             self.job.processed_files = processed_files
-        db.session.commit()
+        
+        now = time.monotonic()
+        if (progress == 100
+                or progress - self._last_progress >= self.PROGRESS_COMMIT_STEP
+                or now - self._last_commit_ts > self.PROGRESS_COMMIT_INTERVAL):
+            db.session.commit()
+            self._last_progress = progress
+            self._last_commit_ts = now
+            self._notify_update()
     
     def update_status(self, status, error_message=None):
         """Update job status in database"""
@@ -45,6 +153,23 @@ class PDFProcessor:
         elif status in [JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED]:
             self.job.completed_at = get_now()
         db.session.commit()
+        self._notify_update()
+    
+    def _notify_update(self):
+        """Pass the job's committed state to the update listener, if any"""
+        if self.on_update is None:
+            return
+        try:
+            self.on_update(self.job_id, {
+                'id': self.job.id,
+                'status': self.job.status.value,
+                'progress': self.job.progress,
+                'total_files': self.job.total_files,
+                'processed_files': self.job.processed_files,
+                'error_message': self.job.error_message
+            })
+        except Exception as e:
+            logger.error(f"Error publishing update for job {self.job_id}: {str(e)}")
     
     def process_job(self):
         """Main processing function that routes to specific processors"""
@@ -113,13 +238,19 @@ class PDFProcessor:
             else:
                 raise ValueError(f"Unknown job type: {self.job.job_type}")
             
+            # Tools skip files they fail on; a job that produced nothing has failed
+            if not result:
+                raise Exception("No output files were produced")
+            
             # Add watermark for free users to all output PDFs
             if is_free_user:
                 self.apply_free_tier_watermark(result)
             
-            self.job.output_files = json.dumps(result)
+            # Final progress, outputs and status go out in one commit
+            self.job.output_files = result
+            self.job.progress = 100
+            self.job.processed_files = self.job.total_files
             self.update_status(JobStatus.COMPLETED)
-            self.update_progress(100, self.job.total_files)
             
             return result
             
@@ -132,37 +263,34 @@ class PDFProcessor:
         """Add 'Processed with SnapPDF' watermark to free tier files"""
         if not file_paths:
             return
+        
+        # The watermark is identical on every page, so render it once
+        packet = BytesIO()
+        can = canvas.Canvas(packet)
+        can.setFont("Helvetica", 40)
+        can.setFillAlpha(0.3)
+        can.saveState()
+        can.translate(300, 400)
+        can.rotate(45)
+        can.drawCentredString(0, 0, "Processed with SnapPDF Free")
+        can.restoreState()
+        can.save()
+        packet.seek(0)
+        watermark = PdfReader(packet).pages[0]
             
         for i, file_path in enumerate(file_paths):
             if not file_path.lower().endswith('.pdf'):
                 continue
                 
             try:
-                from reportlab.pdfgen import canvas
-                from reportlab.lib.colors import grey
-                import io
-                
                 reader = PdfReader(file_path)
                 writer = PdfWriter()
                 
                 for page in reader.pages:
-                    packet = io.BytesIO()
-                    can = canvas.Canvas(packet)
-                    can.setFont("Helvetica", 40)
-                    can.setFillAlpha(0.3)
-                    can.saveState()
-                    can.translate(300, 400)
-                    can.rotate(45)
-                    can.drawCentredString(0, 0, "Processed with SnapPDF Free")
-                    can.restoreState()
-                    can.save()
-                    packet.seek(0)
-                    
-                    watermark = PdfReader(packet).pages[0]
                     page.merge_page(watermark)
                     writer.add_page(page)
                 
-                with open(file_path, 'wb') as f:
+                with _open_buffered(file_path) as f:
                     writer.write(f)
                     
             except Exception as e:
@@ -170,7 +298,7 @@ class PDFProcessor:
 
     def merge_pdfs(self):
         """Merge multiple PDF files into one"""
-        input_files = json.loads(self.job.input_files)
+        input_files = self.input_files
         output_filename = f"merged_{self.job_id}.pdf"
         output_path = os.path.join(self.output_dir, output_filename)
         
@@ -190,21 +318,21 @@ class PDFProcessor:
                 logger.error(f"Error processing file {file_path}: {str(e)}")
                 continue
         
-        with open(output_path, 'wb') as output_file:
+        with _open_buffered(output_path) as output_file:
             writer.write(output_file)
         
         return [output_path]
     
     def split_pdfs(self):
         """Split PDF files into individual pages"""
-        input_files = json.loads(self.job.input_files)
+        input_files = self.input_files
         output_files = []
         
         for file_idx, file_path in enumerate(input_files):
             try:
                 with open(file_path, 'rb') as file:
                     reader = PdfReader(file)
-                    base_name = os.path.splitext(os.path.basename(file_path))[0]
+                    base_name = self.output_stem(file_path)
                     
                     for page_num, page in enumerate(reader.pages):
                         writer = PdfWriter()
@@ -213,7 +341,7 @@ class PDFProcessor:
                         output_filename = f"{base_name}_page_{page_num + 1}_{self.job_id}.pdf"
                         output_path = os.path.join(self.output_dir, output_filename)
                         
-                        with open(output_path, 'wb') as output_file:
+                        with _open_buffered(output_path) as output_file:
                             writer.write(output_file)
                         
                         output_files.append(output_path)
@@ -229,8 +357,8 @@ class PDFProcessor:
     
     def compress_pdfs(self):
         """Compress PDF files with adjustable quality settings"""
-        input_files = json.loads(self.job.input_files)
-        settings = json.loads(self.job.settings) if self.job.settings else {}
+        input_files = self.input_files
+        settings = self.settings
         quality = settings.get('compression_quality', 'medium')  # low, medium, high
         output_files = []
         
@@ -246,11 +374,12 @@ class PDFProcessor:
         for file_idx, file_path in enumerate(input_files):
             try:
                 # Use PyMuPDF for better compression
-                import fitz
+                if fitz is None:
+                    raise ImportError("PyMuPDF is not installed")
                 
                 doc = fitz.open(file_path)
                 
-                base_name = os.path.splitext(os.path.basename(file_path))[0]
+                base_name = self.output_stem(file_path)
                 output_filename = f"{base_name}_compressed_{quality}_{self.job_id}.pdf"
                 output_path = os.path.join(self.output_dir, output_filename)
                 
@@ -300,12 +429,12 @@ class PDFProcessor:
                                 del page['/Annots']
                             writer.add_page(page)
                         
-                        base_name = os.path.splitext(os.path.basename(file_path))[0]
+                        base_name = self.output_stem(file_path)
                         output_filename = generate_unique_filename(f"{base_name}_compressed_{quality}.pdf")
                         output_path = os.path.join(app.config['PROCESSED_FOLDER'], output_filename)
                         os.makedirs(app.config['PROCESSED_FOLDER'], exist_ok=True)
                         
-                        with open(output_path, 'wb') as output_file:
+                        with _open_buffered(output_path) as output_file:
                             writer.write(output_file)
                         
                         output_files.append(output_path)
@@ -327,18 +456,18 @@ class PDFProcessor:
     
     def ocr_pdfs(self):
         """Extract text from PDF files using advanced OCR"""
-        input_files = json.loads(self.job.input_files)
-        settings = json.loads(self.job.settings) if self.job.settings else {}
+        input_files = self.input_files
+        settings = self.settings
         language = settings.get('ocr_language', 'eng')  # Default to English
         output_format = settings.get('output_format', 'txt')  # txt, pdf, both
         output_files = []
         
         for file_idx, file_path in enumerate(input_files):
             try:
-                import fitz  # PyMuPDF for better PDF to image conversion
-                
                 # Open PDF with PyMuPDF for better image extraction
                 try:
+                    if fitz is None:
+                        raise ImportError("PyMuPDF is not installed")
                     pdf_document = fitz.open(file_path)
                     text_content = []
                     
@@ -356,10 +485,7 @@ class PDFProcessor:
                             img_data = pix.tobytes("png")
                             
                             # Convert to PIL Image for OCR
-                            from PIL import Image
-                            import io
-                            
-                            pil_image = Image.open(io.BytesIO(img_data))
+                            pil_image = Image.open(BytesIO(img_data))
                             
                             # Perform OCR
                             try:
@@ -389,7 +515,7 @@ class PDFProcessor:
                             else:
                                 text_content.append(f"=== Page {page_num + 1} ===\n[No extractable text found]")
                 
-                base_name = os.path.splitext(os.path.basename(file_path))[0]
+                base_name = self.output_stem(file_path)
                 
                 # Save as text file
                 if output_format in ['txt', 'both']:
@@ -407,11 +533,6 @@ class PDFProcessor:
                     pdf_output_path = os.path.join(self.output_dir, pdf_filename)
                     
                     # Create a new PDF with the extracted text
-                    from reportlab.pdfgen import canvas
-                    from reportlab.lib.pagesizes import letter
-                    from reportlab.lib.styles import getSampleStyleSheet
-                    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-                    
                     doc = SimpleDocTemplate(pdf_output_path, pagesize=letter)
                     styles = getSampleStyleSheet()
                     story = []
@@ -435,7 +556,7 @@ class PDFProcessor:
     
     def convert_to_word(self):
         """Convert PDF files to Word documents"""
-        input_files = json.loads(self.job.input_files)
+        input_files = self.input_files
         output_files = []
         
         for file_idx, file_path in enumerate(input_files):
@@ -449,7 +570,7 @@ class PDFProcessor:
                         if text.strip():
                             doc.add_paragraph(text)
                     
-                    base_name = os.path.splitext(os.path.basename(file_path))[0]
+                    base_name = self.output_stem(file_path)
                     output_filename = f"{base_name}_{self.job_id}.docx"
                     output_path = os.path.join(self.output_dir, output_filename)
                     
@@ -467,8 +588,8 @@ class PDFProcessor:
 
     def protect_pdfs(self):
         """Protect PDF files with a password"""
-        input_files = json.loads(self.job.input_files)
-        settings = json.loads(self.job.settings) if self.job.settings else {}
+        input_files = self.input_files
+        settings = self.settings
         password = settings.get('password')
         if not password:
             raise ValueError("Password is required for protection")
@@ -482,11 +603,11 @@ class PDFProcessor:
                     writer.add_page(page)
                 writer.encrypt(password)
                 
-                base_name = os.path.splitext(os.path.basename(file_path))[0]
+                base_name = self.output_stem(file_path)
                 output_filename = f"{base_name}_protected_{self.job_id}.pdf"
                 output_path = os.path.join(self.output_dir, output_filename)
                 
-                with open(output_path, 'wb') as f:
+                with _open_buffered(output_path) as f:
                     writer.write(f)
                 output_files.append(output_path)
                 
@@ -499,8 +620,8 @@ class PDFProcessor:
 
     def rotate_pdfs(self):
         """Rotate PDF files"""
-        input_files = json.loads(self.job.input_files)
-        settings = json.loads(self.job.settings) if self.job.settings else {}
+        input_files = self.input_files
+        settings = self.settings
         rotation = int(settings.get('rotation', 90))
         
         output_files = []
@@ -512,11 +633,11 @@ class PDFProcessor:
                     page.rotate(rotation)
                     writer.add_page(page)
                 
-                base_name = os.path.splitext(os.path.basename(file_path))[0]
+                base_name = self.output_stem(file_path)
                 output_filename = f"{base_name}_rotated_{self.job_id}.pdf"
                 output_path = os.path.join(self.output_dir, output_filename)
                 
-                with open(output_path, 'wb') as f:
+                with _open_buffered(output_path) as f:
                     writer.write(f)
                 output_files.append(output_path)
                 
@@ -529,19 +650,15 @@ class PDFProcessor:
 
     def watermark_pdfs(self):
         """Add watermark to PDF files"""
-        input_files = json.loads(self.job.input_files)
-        settings = json.loads(self.job.settings) if self.job.settings else {}
+        input_files = self.input_files
+        settings = self.settings
         text = settings.get('watermark_text', 'CONFIDENTIAL')
         
         output_files = []
         for file_idx, file_path in enumerate(input_files):
             try:
-                from reportlab.pdfgen import canvas
-                from reportlab.lib.pagesizes import letter
-                import io
-                
                 # Create watermark
-                packet = io.BytesIO()
+                packet = BytesIO()
                 can = canvas.Canvas(packet, pagesize=letter)
                 can.setFont("Helvetica", 40)
                 can.setStrokeColorRGB(0.5, 0.5, 0.5, 0.3)
@@ -562,12 +679,12 @@ class PDFProcessor:
                     page.merge_page(watermark_page)
                     writer.add_page(page)
                 
-                base_name = os.path.splitext(os.path.basename(file_path))[0]
+                base_name = self.output_stem(file_path)
                 output_filename = generate_unique_filename(f"{base_name}_watermarked.pdf")
                 output_path = os.path.join(app.config['PROCESSED_FOLDER'], output_filename)
                 os.makedirs(app.config['PROCESSED_FOLDER'], exist_ok=True)
                 
-                with open(output_path, 'wb') as f:
+                with _open_buffered(output_path) as f:
                     writer.write(f)
                 output_files.append(output_path)
                 
@@ -580,8 +697,8 @@ class PDFProcessor:
 
     def unlock_pdfs(self):
         """Unlock protected PDF files"""
-        input_files = json.loads(self.job.input_files)
-        settings = json.loads(self.job.settings) if self.job.settings else {}
+        input_files = self.input_files
+        settings = self.settings
         password = settings.get('password')
         if not password:
             raise ValueError("Password is required for unlocking")
@@ -597,12 +714,12 @@ class PDFProcessor:
                 for page in reader.pages:
                     writer.add_page(page)
                 
-                base_name = os.path.splitext(os.path.basename(file_path))[0]
+                base_name = self.output_stem(file_path)
                 output_filename = generate_unique_filename(f"{base_name}_unlocked.pdf")
                 output_path = os.path.join(app.config['PROCESSED_FOLDER'], output_filename)
                 os.makedirs(app.config['PROCESSED_FOLDER'], exist_ok=True)
                 
-                with open(output_path, 'wb') as f:
+                with _open_buffered(output_path) as f:
                     writer.write(f)
                 output_files.append(output_path)
                 
@@ -615,13 +732,12 @@ class PDFProcessor:
 
     def extract_images_pdfs(self):
         """Extract images from PDF files"""
-        input_files = json.loads(self.job.input_files)
+        input_files = self.input_files
         output_files = []
         for file_idx, file_path in enumerate(input_files):
             try:
-                import fitz
                 doc = fitz.open(file_path)
-                base_name = os.path.splitext(os.path.basename(file_path))[0]
+                base_name = self.output_stem(file_path)
                 
                 for page_num in range(len(doc)):
                     page = doc[page_num]
@@ -655,8 +771,8 @@ class PDFProcessor:
 
     def organize_pdf_pages(self):
         """Organize, remove or extract pages from PDF"""
-        input_files = json.loads(self.job.input_files)
-        settings = json.loads(self.job.settings) if self.job.settings else {}
+        input_files = self.input_files
+        settings = self.settings
         page_indices = settings.get('pages', []) # List of 1-based indices from UI
         
         output_files = []
@@ -684,13 +800,13 @@ class PDFProcessor:
                         if 1 <= p_num <= total_pages:
                             writer.add_page(reader.pages[p_num - 1])
                 
-                base_name = os.path.splitext(os.path.basename(file_path))[0]
+                base_name = self.output_stem(file_path)
                 suffix = self.job.job_type.value
                 output_filename = generate_unique_filename(f"{base_name}_{suffix}.pdf")
                 output_path = os.path.join(app.config['PROCESSED_FOLDER'], output_filename)
                 os.makedirs(app.config['PROCESSED_FOLDER'], exist_ok=True)
                 
-                with open(output_path, 'wb') as f:
+                with _open_buffered(output_path) as f:
                     writer.write(f)
                 output_files.append(output_path)
                 
@@ -702,7 +818,7 @@ class PDFProcessor:
 
     def repair_pdf(self):
         """Attempt to repair a corrupted PDF by re-saving it"""
-        input_files = json.loads(self.job.input_files)
+        input_files = self.input_files
         output_files = []
         for file_idx, file_path in enumerate(input_files):
             try:
@@ -713,7 +829,7 @@ class PDFProcessor:
                 output_filename = generate_unique_filename("repaired.pdf")
                 output_path = os.path.join(app.config['PROCESSED_FOLDER'], output_filename)
                 os.makedirs(app.config['PROCESSED_FOLDER'], exist_ok=True)
-                with open(output_path, 'wb') as f:
+                with _open_buffered(output_path) as f:
                     writer.write(f)
                 output_files.append(output_path)
             except Exception as e:
@@ -722,7 +838,7 @@ class PDFProcessor:
 
     def convert_to_excel(self):
         """Convert PDF to Excel"""
-        input_files = json.loads(self.job.input_files)
+        input_files = self.input_files
         output_files = []
         for file_idx, file_path in enumerate(input_files):
             try:
@@ -732,7 +848,7 @@ class PDFProcessor:
                 for i, page in enumerate(reader.pages):
                     ws.cell(row=i+1, column=1, value=page.extract_text()[:32000])
                 
-                base_name = os.path.splitext(os.path.basename(file_path))[0]
+                base_name = self.output_stem(file_path)
                 output_filename = generate_unique_filename(f"{base_name}.xlsx")
                 output_path = os.path.join(app.config['PROCESSED_FOLDER'], output_filename)
                 os.makedirs(app.config['PROCESSED_FOLDER'], exist_ok=True)
@@ -748,19 +864,18 @@ class PDFProcessor:
 
     def convert_to_pdf(self):
         """Convert images and documents to PDF"""
-        input_files = json.loads(self.job.input_files)
+        input_files = self.input_files
         output_files = []
         
         for file_idx, file_path in enumerate(input_files):
             try:
                 file_ext = os.path.splitext(file_path)[1].lower()
-                base_name = os.path.splitext(os.path.basename(file_path))[0]
+                base_name = self.output_stem(file_path)
                 output_filename = generate_unique_filename(f"{base_name}.pdf")
                 output_path = os.path.join("processed", output_filename)
                 
                 if file_ext in ['.jpg', '.jpeg', '.png', '.gif', '.bmp']:
                     # Image to PDF
-                    from PIL import Image
                     img = Image.open(file_path)
                     if img.mode in ('RGBA', 'LA', 'P'):
                         img = img.convert('RGB')
@@ -769,8 +884,6 @@ class PDFProcessor:
                 elif file_ext == '.docx':
                     # Word to PDF - convert text content
                     doc = Document(file_path)
-                    from reportlab.pdfgen import canvas
-                    from reportlab.lib.pagesizes import letter
                     c = canvas.Canvas(output_path, pagesize=letter)
                     y = 750
                     for para in doc.paragraphs:
@@ -786,8 +899,6 @@ class PDFProcessor:
                     # Excel to PDF - convert spreadsheet
                     wb = openpyxl.load_workbook(file_path)
                     ws = wb.active
-                    from reportlab.pdfgen import canvas
-                    from reportlab.lib.pagesizes import letter
                     c = canvas.Canvas(output_path, pagesize=letter)
                     y = 750
                     for row in ws.iter_rows(values_only=True):
@@ -802,8 +913,6 @@ class PDFProcessor:
                 
                 elif file_ext == '.pptx':
                     # PowerPoint to PDF - basic text extraction
-                    from reportlab.pdfgen import canvas
-                    from reportlab.lib.pagesizes import letter
                     c = canvas.Canvas(output_path, pagesize=letter)
                     y = 750
                     c.drawString(50, y, f"PowerPoint: {base_name}")
@@ -813,22 +922,12 @@ class PDFProcessor:
                 
                 elif file_ext == '.html':
                     # HTML to PDF - basic conversion
-                    from reportlab.pdfgen import canvas
-                    from reportlab.lib.pagesizes import letter
                     c = canvas.Canvas(output_path, pagesize=letter)
                     c.drawString(50, 750, f"HTML Document: {base_name}")
                     with open(file_path, 'r', encoding='utf-8') as f:
                         content = f.read()
                         # Simple text extraction
-                        from html.parser import HTMLParser
-                        class TextExtractor(HTMLParser):
-                            def __init__(self):
-                                super().__init__()
-                                self.text = []
-                            def handle_data(self, data):
-                                if data.strip():
-                                    self.text.append(data.strip())
-                        parser = TextExtractor()
+                        parser = _HTMLTextExtractor()
                         parser.feed(content)
                         y = 720
                         for text in parser.text[:50]:  # Limit to first 50 lines
@@ -848,46 +947,40 @@ class PDFProcessor:
 
     def convert_from_pdf(self):
         """Convert PDF to other formats (images, documents, slides, sheets)"""
-        input_files = json.loads(self.job.input_files)
+        input_files = self.input_files
         output_files = []
         
         for file_idx, file_path in enumerate(input_files):
             try:
-                import fitz
-                doc = fitz.open(file_path)
-                base_name = os.path.splitext(os.path.basename(file_path))[0]
+                # Inputs are always PDFs, so skip MuPDF's format detection
+                doc = fitz.open(file_path, filetype="pdf")
+                base_name = self.output_stem(file_path)
                 
                 if self.job.job_type == JobType.PDF_TO_JPG:
-                    # PDF to JPG - convert each page to image
-                    for page_num in range(len(doc)):
-                        page = doc[page_num]
-                        pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
-                        output_filename = generate_unique_filename(f"{base_name}_page_{page_num+1}.jpg")
-                        output_path = os.path.join(app.config['PROCESSED_FOLDER'], output_filename)
-                        os.makedirs(app.config['PROCESSED_FOLDER'], exist_ok=True)
-                        pix.save(output_path)
-                        output_files.append(output_path)
+                    # PDF to JPG - convert each page to image, writing encoded pages
+                    # on worker threads while the next page is rasterized
+                    os.makedirs(app.config['PROCESSED_FOLDER'], exist_ok=True)
+                    with ThreadPoolExecutor(max_workers=4) as executor:
+                        writes = []
+                        for page_num in range(len(doc)):
+                            page = doc[page_num]
+                            pix = page.get_pixmap(matrix=fitz.Matrix(2, 2), alpha=False)
+                            img_data = pix.tobytes("jpeg", jpg_quality=85)
+                            output_filename = generate_unique_filename(f"{base_name}_page_{page_num+1}.jpg")
+                            output_path = os.path.join(app.config['PROCESSED_FOLDER'], output_filename)
+                            writes.append(executor.submit(_write_bytes, output_path, img_data))
+                            output_files.append(output_path)
+                        for write in writes:
+                            write.result()
                 
                 elif self.job.job_type == JobType.PDF_TO_POWERPOINT:
                     # PDF to PowerPoint - convert each page to a slide image
-                    from pptx import Presentation
-                    from pptx.util import Inches
                     prs = Presentation()
                     # Set slide size to match common PDF aspect ratio or standard 4:3
                     prs.slide_width = Inches(10)
                     prs.slide_height = Inches(7.5)
                     
-                    for page_num in range(len(doc)):
-                        page = doc[page_num]
-                        pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
-                        img_filename = generate_unique_filename(f"temp_slide_{page_num}.png")
-                        img_path = os.path.join("/tmp", img_filename)
-                        pix.save(img_path)
-                        
-                        slide = prs.slides.add_slide(prs.slide_layouts[6]) # blank slide
-                        slide.shapes.add_picture(img_path, 0, 0, width=prs.slide_width, height=prs.slide_height)
-                        if os.path.exists(img_path):
-                            os.remove(img_path)
+                    self._add_page_slides(doc, prs)
                             
                     output_filename = generate_unique_filename(f"{base_name}.pptx")
                     output_path = os.path.join(app.config['PROCESSED_FOLDER'], output_filename)
@@ -896,20 +989,19 @@ class PDFProcessor:
                     output_files.append(output_path)
                 
                 elif self.job.job_type == JobType.PDF_TO_EXCEL:
-                    # PDF to Excel - extract text content
-                    import openpyxl
-                    wb = openpyxl.Workbook()
-                    ws = wb.active
-                    ws.title = "Extracted Text"
+                    # PDF to Excel - extract text content, streaming rows with a write-only workbook
+                    wb = openpyxl.Workbook(write_only=True)
+                    ws = wb.create_sheet(title="Extracted Text")
                     
-                    row = 1
+                    # Plain text only: no image blocks or ligature preservation
+                    text_flags = fitz.TEXT_PRESERVE_WHITESPACE | fitz.TEXT_MEDIABOX_CLIP
                     for page_num in range(len(doc)):
                         page = doc[page_num]
-                        text = page.get_text()
+                        text = page.get_text("text", flags=text_flags)
                         for line in text.split('\n'):
-                            if line.strip():
-                                ws.cell(row=row, column=1, value=line.strip())
-                                row += 1
+                            line = line.strip()
+                            if line:
+                                ws.append([line])
                                 
                     output_filename = generate_unique_filename(f"{base_name}.xlsx")
                     output_path = os.path.join(app.config['PROCESSED_FOLDER'], output_filename)
@@ -935,44 +1027,83 @@ class PDFProcessor:
         
         return output_files
 
+    def _add_page_slides(self, doc, prs, max_pending=4):
+        """Add one full-slide picture per PDF page.
+
+        Pages are rasterized on a producer thread and handed over through a
+        bounded queue, so rendering overlaps with building the slides while
+        at most max_pending rendered pages are held in memory.
+        """
+        pages = queue.Queue(maxsize=max_pending)
+        stop = threading.Event()
+        errors = []
+        
+        def produce():
+            try:
+                for page_num in range(len(doc)):
+                    if stop.is_set():
+                        break
+                    pix = doc[page_num].get_pixmap(matrix=fitz.Matrix(2, 2))
+                    pages.put(pix.tobytes("png"))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                pages.put(None)
+        
+        producer = threading.Thread(target=produce, name=f"SlideRender-{self.job_id}", daemon=True)
+        producer.start()
+        finished = False
+        try:
+            while True:
+                img_data = pages.get()
+                if img_data is None:
+                    finished = True
+                    break
+                slide = prs.slides.add_slide(prs.slide_layouts[6]) # blank slide
+                slide.shapes.add_picture(BytesIO(img_data), 0, 0, width=prs.slide_width, height=prs.slide_height)
+        finally:
+            if not finished:
+                # Unblock the producer so it can exit
+                stop.set()
+                while pages.get() is not None:
+                    pass
+            producer.join()
+        
+        if errors:
+            raise errors[0]
+
     def add_page_numbers(self):
         """Add page numbers to the bottom of each page"""
-        input_files = json.loads(self.job.input_files)
+        input_files = self.input_files
         output_files = []
         
         for file_idx, file_path in enumerate(input_files):
             try:
-                from reportlab.pdfgen import canvas
-                from reportlab.lib.pagesizes import letter
-                import io
-                
                 reader = PdfReader(file_path)
                 writer = PdfWriter()
                 
-                for page_num, page in enumerate(reader.pages):
-                    # Create page number annotation
-                    page_num_str = str(page_num + 1)
-                    
-                    # Create a canvas for the page number
-                    packet = io.BytesIO()
-                    can = canvas.Canvas(packet, pagesize=(612, 792))
+                # Draw every page number on one canvas, one overlay page per PDF page
+                packet = BytesIO()
+                can = canvas.Canvas(packet, pagesize=(612, 792))
+                for page_num in range(len(reader.pages)):
                     can.setFont("Helvetica", 10)
-                    can.drawRightString(570, 20, page_num_str)
-                    can.save()
-                    packet.seek(0)
-                    
-                    # Merge with original page
-                    page_num_reader = PdfReader(packet)
-                    page_num_page = page_num_reader.pages[0]
+                    can.drawRightString(570, 20, str(page_num + 1))
+                    can.showPage()
+                can.save()
+                packet.seek(0)
+                page_num_pages = PdfReader(packet).pages
+                
+                # Merge with original pages
+                for page, page_num_page in zip(reader.pages, page_num_pages):
                     page.merge_page(page_num_page)
                     writer.add_page(page)
                 
-                base_name = os.path.splitext(os.path.basename(file_path))[0]
+                base_name = self.output_stem(file_path)
                 output_filename = generate_unique_filename(f"{base_name}_numbered.pdf")
                 output_path = os.path.join(app.config['PROCESSED_FOLDER'], output_filename)
                 os.makedirs(app.config['PROCESSED_FOLDER'], exist_ok=True)
                 
-                with open(output_path, 'wb') as f:
+                with _open_buffered(output_path) as f:
                     writer.write(f)
                 output_files.append(output_path)
                 
@@ -986,42 +1117,41 @@ class PDFProcessor:
 
     def crop_pdf(self):
         """Crop PDF pages to specified dimensions"""
-        input_files = json.loads(self.job.input_files)
-        settings = json.loads(self.job.settings) if self.job.settings else {}
+        input_files = self.input_files
+        settings = self.settings
         # Default crop coordinates (left, top, right, bottom) as percentages
         crop_box = settings.get('crop_box', [0.1, 0.1, 0.9, 0.9])
         output_files = []
         
+        if fitz is None:
+            raise ImportError("PyMuPDF is required to crop PDFs")
+        
         for file_idx, file_path in enumerate(input_files):
             try:
-                reader = PdfReader(file_path)
-                writer = PdfWriter()
-                
-                for page in reader.pages:
-                    # Get page dimensions
-                    mediabox = page.mediabox
-                    width = float(mediabox.width)
-                    height = float(mediabox.height)
+                # Cropping only touches each page's /CropBox, so edit the document
+                # in place with PyMuPDF instead of copying every page into a PdfWriter
+                with fitz.open(file_path) as doc:
+                    for page in doc:
+                        # Get page dimensions (PDF space: origin bottom-left, y pointing up)
+                        mediabox = page.mediabox
+                        width = mediabox.width
+                        height = mediabox.height
                     
-                    # Calculate crop box
-                    left = width * crop_box[0]
-                    top = height * crop_box[1]
-                    right = width * crop_box[2]
-                    bottom = height * crop_box[3]
+                        # top/bottom percentages are measured down from the top edge. The box is
+                        # written in PDF space directly, since set_cropbox's coordinate
+                        # convention differs between PyMuPDF versions
+                        left = mediabox.x0 + width * crop_box[0]
+                        right = mediabox.x0 + width * crop_box[2]
+                        top = mediabox.y1 - height * crop_box[1]
+                        bottom = mediabox.y1 - height * crop_box[3]
+                        doc.xref_set_key(page.xref, "CropBox", f"[{left:g} {bottom:g} {right:g} {top:g}]")
                     
-                    # Crop the page
-                    page.cropbox.lower_left = (left, height - bottom)
-                    page.cropbox.upper_right = (right, height - top)
+                    base_name = self.output_stem(file_path)
+                    output_filename = generate_unique_filename(f"{base_name}_cropped.pdf")
+                    output_path = os.path.join(app.config['PROCESSED_FOLDER'], output_filename)
+                    os.makedirs(app.config['PROCESSED_FOLDER'], exist_ok=True)
                     
-                    writer.add_page(page)
-                
-                base_name = os.path.splitext(os.path.basename(file_path))[0]
-                output_filename = generate_unique_filename(f"{base_name}_cropped.pdf")
-                output_path = os.path.join(app.config['PROCESSED_FOLDER'], output_filename)
-                os.makedirs(app.config['PROCESSED_FOLDER'], exist_ok=True)
-                
-                with open(output_path, 'wb') as f:
-                    writer.write(f)
+                    doc.save(output_path, garbage=0, clean=False)
                 output_files.append(output_path)
                 
                 progress = int((file_idx + 1) / len(input_files) * 100)
@@ -1034,37 +1164,35 @@ class PDFProcessor:
 
     def edit_pdf(self):
         """Edit PDF content - basic implementation adding a text layer or overlay"""
-        input_files = json.loads(self.job.input_files)
-        settings = json.loads(self.job.settings) if self.job.settings else {}
+        input_files = self.input_files
+        settings = self.settings
         edit_text = settings.get('edit_text', 'Edited with SnapPDF')
         output_files = []
         
+        # Same overlay for every page of every file
+        packet = BytesIO()
+        can = canvas.Canvas(packet)
+        can.setFont("Helvetica", 12)
+        can.drawString(100, 100, edit_text)
+        can.save()
+        packet.seek(0)
+        overlay = PdfReader(packet).pages[0]
+        
         for file_idx, file_path in enumerate(input_files):
             try:
-                from reportlab.pdfgen import canvas
-                import io
-                
                 reader = PdfReader(file_path)
                 writer = PdfWriter()
                 
                 for page in reader.pages:
-                    packet = io.BytesIO()
-                    can = canvas.Canvas(packet)
-                    can.setFont("Helvetica", 12)
-                    can.drawString(100, 100, edit_text)
-                    can.save()
-                    packet.seek(0)
-                    
-                    overlay = PdfReader(packet).pages[0]
                     page.merge_page(overlay)
                     writer.add_page(page)
                 
-                base_name = os.path.splitext(os.path.basename(file_path))[0]
+                base_name = self.output_stem(file_path)
                 output_filename = generate_unique_filename(f"{base_name}_edited.pdf")
                 output_path = os.path.join(app.config['PROCESSED_FOLDER'], output_filename)
                 os.makedirs(app.config['PROCESSED_FOLDER'], exist_ok=True)
                 
-                with open(output_path, 'wb') as f:
+                with _open_buffered(output_path) as f:
                     writer.write(f)
                 output_files.append(output_path)
                 
@@ -1077,37 +1205,34 @@ class PDFProcessor:
 
     def sign_pdf(self):
         """Sign PDF (add signature text to last page)"""
-        input_files = json.loads(self.job.input_files)
-        settings = json.loads(self.job.settings) if self.job.settings else {}
+        input_files = self.input_files
+        settings = self.settings
         signature_text = settings.get('signature_text', 'Signed electronically')
         output_files = []
+        
+        # Create signature overlay, shared by all files of the job
+        packet = BytesIO()
+        can = canvas.Canvas(packet, pagesize=letter)
+        can.setFont("Helvetica-Bold", 12)
+        can.drawString(50, 50, signature_text)
+        can.save()
+        packet.seek(0)
+        signature_page = PdfReader(packet).pages[0]
+        
         for file_idx, file_path in enumerate(input_files):
             try:
-                from reportlab.pdfgen import canvas
-                from reportlab.lib.pagesizes import letter
-                import io
-                
                 reader = PdfReader(file_path)
                 writer = PdfWriter()
                 for page in reader.pages:
                     writer.add_page(page)
                 
-                # Create signature overlay
-                packet = io.BytesIO()
-                can = canvas.Canvas(packet, pagesize=letter)
-                can.setFont("Helvetica-Bold", 12)
-                can.drawString(50, 50, signature_text)
-                can.save()
-                packet.seek(0)
+                writer.pages[-1].merge_page(signature_page)
                 
-                sig_reader = PdfReader(packet)
-                writer.pages[-1].merge_page(sig_reader.pages[0])
-                
-                base_name = os.path.splitext(os.path.basename(file_path))[0]
+                base_name = self.output_stem(file_path)
                 output_filename = generate_unique_filename(f"{base_name}_signed.pdf")
                 output_path = os.path.join(app.config['PROCESSED_FOLDER'], output_filename)
                 os.makedirs(app.config['PROCESSED_FOLDER'], exist_ok=True)
-                with open(output_path, 'wb') as f:
+                with _open_buffered(output_path) as f:
                     writer.write(f)
                 output_files.append(output_path)
                 
@@ -1118,26 +1243,30 @@ class PDFProcessor:
 
     def redact_pdf(self):
         """Redact text from PDF"""
-        input_files = json.loads(self.job.input_files)
-        settings = json.loads(self.job.settings) if self.job.settings else {}
+        input_files = self.input_files
+        settings = self.settings
         keywords = settings.get('keywords', [])
+        # The tool form sends a comma-separated string
+        if isinstance(keywords, str):
+            keywords = keywords.split(',')
+        keywords = [str(kw).strip() for kw in keywords if str(kw).strip()]
+        # A single alternation is matched against each page's text instead of one search_for per keyword
+        pattern = re.compile("|".join(re.escape(kw) for kw in keywords), re.IGNORECASE) if keywords else None
         output_files = []
         for file_idx, file_path in enumerate(input_files):
             try:
-                import fitz
-                doc = fitz.open(file_path)
-                for page in doc:
-                    for kw in keywords:
-                        for inst in page.search_for(kw):
-                            page.add_redact_annotation(inst, fill=(0,0,0))
-                    page.apply_redactions()
-                
-                base_name = os.path.splitext(os.path.basename(file_path))[0]
-                output_filename = generate_unique_filename(f"{base_name}_redacted.pdf")
-                output_path = os.path.join(app.config['PROCESSED_FOLDER'], output_filename)
-                os.makedirs(app.config['PROCESSED_FOLDER'], exist_ok=True)
-                doc.save(output_path)
-                doc.close()
+                with fitz.open(file_path) as doc:
+                    for page in doc:
+                        if pattern:
+                            for rect in self._find_redaction_rects(page, pattern):
+                                page.add_redact_annot(rect, fill=(0, 0, 0))
+                        page.apply_redactions()
+                    
+                    base_name = self.output_stem(file_path)
+                    output_filename = generate_unique_filename(f"{base_name}_redacted.pdf")
+                    output_path = os.path.join(app.config['PROCESSED_FOLDER'], output_filename)
+                    os.makedirs(app.config['PROCESSED_FOLDER'], exist_ok=True)
+                    doc.save(output_path)
                 output_files.append(output_path)
                 
                 self.update_progress(int((file_idx + 1) / len(input_files) * 100), file_idx + 1)
@@ -1145,9 +1274,28 @@ class PDFProcessor:
                 logger.error(f"Redaction failed: {e}")
         return output_files
 
+    @staticmethod
+    def _find_redaction_rects(page, pattern):
+        """Return the rects of all words covered by a match of pattern on the page"""
+        words = page.get_text("words")
+        # Character offset of each word inside the space-joined page text
+        starts = []
+        offset = 0
+        for word in words:
+            starts.append(offset)
+            offset += len(word[4]) + 1
+        joined = " ".join(word[4] for word in words)
+        
+        rects = []
+        for match in pattern.finditer(joined):
+            first = bisect.bisect_right(starts, match.start()) - 1
+            last = bisect.bisect_right(starts, match.end() - 1) - 1
+            rects.extend(fitz.Rect(word[:4]) for word in words[first:last + 1])
+        return rects
+
     def compare_pdf(self):
         """Compare two PDFs (basic page count comparison report)"""
-        input_files = json.loads(self.job.input_files)
+        input_files = self.input_files
         if len(input_files) < 2:
             return []
         
@@ -1171,7 +1319,7 @@ class PDFProcessor:
 
     def convert_to_excel(self):
         """Convert PDF to Excel"""
-        input_files = json.loads(self.job.input_files)
+        input_files = self.input_files
         output_files = []
         for file_idx, file_path in enumerate(input_files):
             try:
@@ -1181,7 +1329,7 @@ class PDFProcessor:
                 for i, page in enumerate(reader.pages):
                     ws.cell(row=i+1, column=1, value=page.extract_text()[:32000])
                 
-                base_name = os.path.splitext(os.path.basename(file_path))[0]
+                base_name = self.output_stem(file_path)
                 output_filename = generate_unique_filename(f"{base_name}.xlsx")
                 output_path = os.path.join(app.config['PROCESSED_FOLDER'], output_filename)
                 os.makedirs(app.config['PROCESSED_FOLDER'], exist_ok=True)
@@ -1195,6 +1343,86 @@ class PDFProcessor:
                 continue
         return output_files
 
+def read_pdf_info(file_path):
+    """Read the page count, document metadata and encryption flag of a PDF"""
+    doc = fitz.open(file_path)
+    try:
+        return {'pages': doc.page_count, 'metadata': dict(doc.metadata or {}), 'encrypted': doc.is_encrypted}
+    finally:
+        doc.close()
+
+PREVIEW_JPEG_QUALITY = 75
+
+def render_preview(file_path, cache_path, zoom, image_format='jpeg'):
+    """Render the first page of a PDF to an image file at cache_path.
+    
+    Returns False if the document has no pages to preview.
+    """
+    doc = fitz.open(file_path)
+    try:
+        if doc.page_count == 0:
+            return False
+        pix = doc[0].get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+        if image_format == 'png':
+            img_data = pix.tobytes("png")
+        else:
+            img_data = pix.tobytes("jpeg", jpg_quality=PREVIEW_JPEG_QUALITY)
+    finally:
+        doc.close()
+    
+    # Write under a temporary name so readers never see a partial image
+    tmp_path = f"{cache_path}.{uuid.uuid4().hex}.tmp"
+    _write_bytes(tmp_path, img_data)
+    os.replace(tmp_path, cache_path)
+    return True
+
+# Formats that are already compressed; deflating them again costs CPU for no size gain
+PRECOMPRESSED_EXTENSIONS = {'.pdf', '.jpg', '.jpeg', '.png', '.docx', '.xlsx', '.pptx', '.zip'}
+
+def get_zip_compress_type(file_path):
+    """Pick the ZIP compression method for a file based on its extension"""
+    if os.path.splitext(file_path)[1].lower() in PRECOMPRESSED_EXTENSIONS:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+class _ZipChunkBuffer:
+    """Write-only file object collecting ZIP output until the stream generator yields it"""
+    def __init__(self):
+        self.chunks = []
+    
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+    
+    def flush(self):
+        pass
+    
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+def stream_zip_archive(file_paths, chunk_size=256 * 1024):
+    """Yield a ZIP archive of the given files chunk by chunk, without staging it on disk"""
+    buffer = _ZipChunkBuffer()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED, allowZip64=True, compresslevel=1) as zipf:
+        for file_path in file_paths:
+            if not os.path.exists(file_path):
+                continue
+            zinfo = zipfile.ZipInfo.from_file(file_path, os.path.basename(file_path))
+            zinfo.compress_type = get_zip_compress_type(file_path)
+            # open() takes the level from the ZipInfo, not from the ZipFile; the ZipInfo level
+            # is public from Python 3.13 (older versions deflate at zlib's default level)
+            if zinfo.compress_type == zipfile.ZIP_DEFLATED and hasattr(zinfo, 'compress_level'):
+                zinfo.compress_level = zipf.compresslevel
+            with open(file_path, 'rb') as src, zipf.open(zinfo, 'w', force_zip64=True) as dest:
+                for chunk in iter(lambda: src.read(chunk_size), b""):
+                    dest.write(chunk)
+                    data = buffer.drain()
+                    if data:
+                        yield data
+    yield buffer.drain()
+
 def create_zip_archive(file_paths, zip_filename):
     """Create a ZIP archive from multiple files in PROCESSED_FOLDER"""
     from app import app
@@ -1202,10 +1430,10 @@ def create_zip_archive(file_paths, zip_filename):
     os.makedirs(processed_folder, exist_ok=True)
     zip_path = os.path.join(processed_folder, zip_filename)
     
-    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED, allowZip64=True, compresslevel=1) as zipf:
         for file_path in file_paths:
             if os.path.exists(file_path):
                 arcname = os.path.basename(file_path)
-                zipf.write(file_path, arcname)
+                zipf.write(file_path, arcname, compress_type=get_zip_compress_type(file_path))
     
     return zip_path
@@ -1,12 +1,14 @@
+import os
 import json
 import logging
 import threading
 import time
 from queue import Queue
+from sqlalchemy.orm import joinedload
 from datetime import datetime
 from app import app, db
-from models import ProcessingJob, JobStatus, get_now
-from pdf_processor import PDFProcessor
+from models import ProcessingJob, FileUpload, JobStatus, get_now
+from pdf_processor import PDFProcessor, render_preview, read_pdf_info
 
 logger = logging.getLogger(__name__)
 
@@ -16,13 +18,89 @@ class QueueManager:
         self.workers = []
         self.is_running = False
         self.max_workers = 2  # Limit concurrent processing
+        
+        # Preview rendering has its own queue so it never waits behind processing jobs
+        self.preview_queue = Queue()
+        self.preview_workers = []
+        self.max_preview_workers = 1
+        self._pending_previews = set()
+        self._failed_previews = set()
+        self._preview_lock = threading.Lock()
+        
+        # Short-lived status cache absorbing frontend polling: key -> (timestamp, value)
+        self._status_cache = {}
+        self._status_cache_lock = threading.Lock()
+        
+        # Latest update per job for event streams: job_id -> (version, status dict)
+        self._job_events = {}
+        self._job_events_cond = threading.Condition()
+        self._job_events_version = 0
+        
+        self._start_lock = threading.Lock()
+        # Process that started the worker threads (None until started)
+        self.pid = None
     
-    def start(self):
-        """Start the queue manager and worker threads"""
-        if self.is_running:
-            return
+    QUEUE_STATUS_TTL = 1.0
+    JOB_STATUS_TTL = 0.5
+    # Finished jobs never change again, so their status can be kept much longer
+    FINISHED_JOB_STATUS_TTL = 300.0
+    STATUS_CACHE_MAX_ENTRIES = 1024
+    
+    def _cached_status(self, key, ttl, compute):
+        """Return a copy of a cached status dict, recomputing it once it expires.
         
-        self.is_running = True
+        ttl is a number of seconds or a function of the computed value returning one.
+        """
+        now = time.monotonic()
+        with self._status_cache_lock:
+            entry = self._status_cache.get(key)
+        if entry and now < entry[0]:
+            value = entry[1]
+        else:
+            value = compute()
+            expires_at = now + (ttl(value) if callable(ttl) else ttl)
+            with self._status_cache_lock:
+                if len(self._status_cache) >= self.STATUS_CACHE_MAX_ENTRIES:
+                    self._status_cache = {k: v for k, v in self._status_cache.items() if now < v[0]}
+                self._status_cache[key] = (expires_at, value)
+        # Callers add keys to the returned dict, so never hand out the cached one
+        return dict(value) if value is not None else None
+    
+    def _invalidate_job_status(self, job_id):
+        """Drop a job's cached status after it changed"""
+        with self._status_cache_lock:
+            self._status_cache.pop(('job', job_id), None)
+    
+    TERMINAL_STATUSES = ('completed', 'failed', 'cancelled')
+    JOB_EVENTS_MAX_ENTRIES = 1024
+    
+    def publish_job_event(self, job_id, status):
+        """Record a job's latest status and wake the streams waiting on it"""
+        self._invalidate_job_status(job_id)
+        with self._job_events_cond:
+            if len(self._job_events) >= self.JOB_EVENTS_MAX_ENTRIES:
+                # Finished jobs have no more updates to deliver
+                self._job_events = {k: v for k, v in self._job_events.items() if v[1]['status'] not in self.TERMINAL_STATUSES}
+            self._job_events_version += 1
+            self._job_events[job_id] = (self._job_events_version, status)
+            self._job_events_cond.notify_all()
+    
+    def wait_job_event(self, job_id, last_version=0, timeout=15):
+        """Wait for an update of a job newer than last_version; returns (version, status) or None on timeout"""
+        def newer():
+            event = self._job_events.get(job_id)
+            return event if event and event[0] > last_version else None
+        with self._job_events_cond:
+            event = self._job_events_cond.wait_for(newer, timeout)
+        return (event[0], dict(event[1])) if event else None
+    
+    def start(self):
+        """Start the queue manager and worker threads; safe to call more than once"""
+        with self._start_lock:
+            if self.is_running:
+                return
+            self.is_running = True
+            self.pid = os.getpid()
         
         # Start worker threads
         for i in range(self.max_workers):
@@ -31,42 +109,131 @@ class QueueManager:
             worker.start()
             self.workers.append(worker)
         
+        for i in range(self.max_preview_workers):
+            worker = threading.Thread(target=self._preview_worker, name=f"PreviewWorker-{i}")
+            worker.daemon = True
+            worker.start()
+            self.preview_workers.append(worker)
+        
         logger.info(f"Queue manager started with {self.max_workers} workers")
     
     def stop(self):
-        """Stop the queue manager"""
+        """Stop the queue manager and wait for workers to finish their current job"""
+        if not self.is_running:
+            return
+        
         self.is_running = False
+        
+        # One sentinel per worker wakes each blocked get() so it can exit
+        for _ in self.workers:
+            self.job_queue.put(None)
+        for _ in self.preview_workers:
+            self.preview_queue.put(None)
+        for worker in self.workers + self.preview_workers:
+            worker.join()
+        self.workers = []
+        self.preview_workers = []
+        
         logger.info("Queue manager stopped")
     
     def add_job(self, job_id):
         """Add a job to the processing queue with priority support"""
+        self.add_jobs([job_id])
+    
+    def add_jobs(self, job_ids):
+        """Add several jobs to the processing queue, loading them in one query"""
+        if not job_ids:
+            return
+        
         with app.app_context():
-            job = ProcessingJob.query.get(job_id)
-            if job and job.user and job.user.is_premium:
+            jobs = ProcessingJob.query.options(joinedload(ProcessingJob.user)).filter(ProcessingJob.id.in_(job_ids)).all()
+            premium_job_ids = {job.id for job in jobs if job.user and job.user.is_premium}
+        
+        for job_id in job_ids:
+            if job_id in premium_job_ids:
                 # Pro users get priority (handled by putting at front or using PriorityQueue)
                 # For simplicity with current Queue, we'll keep it as is but mark for workers
                 logger.info(f"Priority job {job_id} added to queue")
             else:
                 logger.info(f"Standard job {job_id} added to queue")
-        
-        self.job_queue.put(job_id)
+            self.job_queue.put(job_id)
     
     def _worker(self):
         """Worker thread function that processes jobs from the queue"""
-        while self.is_running:
+        while True:
+            # Block until work arrives instead of polling; None is the shutdown sentinel
+            job_id = self.job_queue.get()
             try:
-                job_id = self.job_queue.get(timeout=1)
+                if job_id is None:
+                    return
                 self._process_job(job_id)
+            except Exception as e:
+                logger.error(f"Unexpected error in worker for job {job_id}: {str(e)}")
+            finally:
                 self.job_queue.task_done()
-            except:
-                # Timeout or other exception, continue
-                continue
+    
+    def add_preview_job(self, file_path, cache_path, zoom, image_format='jpeg'):
+        """Queue rendering of a preview image unless it is already pending"""
+        with self._preview_lock:
+            if cache_path in self._pending_previews:
+                return
+            self._pending_previews.add(cache_path)
+            self._failed_previews.discard(cache_path)
+        self.preview_queue.put(('preview', file_path, cache_path, zoom, image_format))
+    
+    def add_file_info_job(self, file_id, file_path):
+        """Queue reading an uploaded PDF's page count and metadata into its FileUpload row"""
+        self.preview_queue.put(('info', file_id, file_path))
+    
+    def preview_failed(self, cache_path):
+        """Whether rendering the preview at cache_path was attempted and failed"""
+        with self._preview_lock:
+            return cache_path in self._failed_previews
+    
+    def _preview_worker(self):
+        """Worker thread function that renders queued previews and reads file info"""
+        while True:
+            item = self.preview_queue.get()
+            try:
+                if item is None:
+                    return
+                if item[0] == 'info':
+                    self._store_file_info(*item[1:])
+                    continue
+                file_path, cache_path, zoom, image_format = item[1:]
+                try:
+                    rendered = render_preview(file_path, cache_path, zoom, image_format)
+                except Exception as e:
+                    logger.error(f"Error rendering preview for {file_path}: {str(e)}")
+                    rendered = False
+                with self._preview_lock:
+                    self._pending_previews.discard(cache_path)
+                    if not rendered:
+                        if len(self._failed_previews) >= self.STATUS_CACHE_MAX_ENTRIES:
+                            self._failed_previews.clear()
+                        self._failed_previews.add(cache_path)
+            finally:
+                self.preview_queue.task_done()
+    
+    def _store_file_info(self, file_id, file_path):
+        """Read a PDF's details and save them on its FileUpload row"""
+        try:
+            info = read_pdf_info(file_path)
+        except Exception as e:
+            logger.warning(f"Could not read PDF metadata for {file_id}: {str(e)}")
+            return
+        try:
+            with app.app_context():
+                db.session.execute(FileUpload.__table__.update().where(FileUpload.id == file_id).values(page_count=info['pages'], is_encrypted=info['encrypted'], pdf_metadata=info['metadata']))
+                db.session.commit()
+        except Exception as e:
+            logger.error(f"Error storing file info for {file_id}: {str(e)}")
     
     def _process_job(self, job_id):
         """Process a single job"""
         try:
             with app.app_context():
-                processor = PDFProcessor(job_id)
+                processor = PDFProcessor(job_id, on_update=self.publish_job_event)
                 processor.process_job()
                 logger.info(f"Job {job_id} completed successfully")
         except Exception as e:
@@ -74,6 +241,9 @@ class QueueManager:
     
     def get_queue_status(self):
         """Get current queue status"""
+        return self._cached_status('queue', self.QUEUE_STATUS_TTL, self._load_queue_status)
+    
+    def _load_queue_status(self):
         return {
             'queue_size': self.job_queue.qsize(),
             'is_running': self.is_running,
@@ -82,8 +252,16 @@ class QueueManager:
     
     def get_job_status(self, job_id):
         """Get status of a specific job"""
+        return self._cached_status(('job', job_id), self._job_status_ttl, lambda: self._load_job_status(job_id))
+    
+    def _job_status_ttl(self, status):
+        if status and status['status'] in self.TERMINAL_STATUSES:
+            return self.FINISHED_JOB_STATUS_TTL
+        return self.JOB_STATUS_TTL
+    
+    def _load_job_status(self, job_id):
         with app.app_context():
-            job = ProcessingJob.query.get(job_id)
+            job = db.session.get(ProcessingJob, job_id)
             if not job:
                 return None
             
@@ -102,21 +280,49 @@ class QueueManager:
     def cancel_job(self, job_id):
         """Cancel a job"""
         with app.app_context():
-            job = ProcessingJob.query.get(job_id)
+            job = db.session.get(ProcessingJob, job_id)
             if job and job.status in [JobStatus.PENDING, JobStatus.PROCESSING]:
                 job.status = JobStatus.CANCELLED
                 job.completed_at = get_now()
                 db.session.commit()
+                self.publish_job_event(job_id, {
+                    'id': job.id,
+                    'status': job.status.value,
+                    'progress': job.progress,
+                    'total_files': job.total_files,
+                    'processed_files': job.processed_files,
+                    'error_message': job.error_message
+                })
                 return True
             return False
 
 # Global queue manager instance
 queue_manager = QueueManager()
 
+_restart_lock = threading.Lock()
+
+def _ensure_own_manager():
+    """Give a forked process its own queue manager.
+    
+    Threads do not survive fork(), so a manager started before the fork (e.g.
+    gunicorn --preload) would look running in the child with no workers. Checked
+    lazily rather than in a fork hook, so worker processes forked for other
+    purposes (multiprocessing, process pools) never start queue threads.
+    """
+    global queue_manager
+    if queue_manager.pid in (None, os.getpid()):
+        return
+    with _restart_lock:
+        if queue_manager.pid not in (None, os.getpid()):
+            queue_manager = QueueManager()
+            queue_manager.start()
+
 def start_queue_manager():
     """Start the global queue manager"""
+    _ensure_own_manager()
     queue_manager.start()
 
 def get_queue_manager():
     """Get the global queue manager instance"""
+    _ensure_own_manager()
     return queue_manager
@@ -1,18 +1,29 @@
 import os
+import gzip
 import json
+import math
+import functools
+import mimetypes
 import uuid
+import secrets
+import time
+import threading
 import logging
 from datetime import datetime, timedelta
-from urllib.parse import urlparse
-from flask import session, render_template, request, redirect, url_for, flash, jsonify, send_file, abort, Response
+from pathlib import Path
+from types import MappingProxyType
+from urllib.parse import urlparse, quote
+from flask import g, session, render_template, request, redirect, url_for, flash, jsonify, send_file, abort, Response
 from werkzeug.utils import secure_filename
+from sqlalchemy import insert, select
+from sqlalchemy.orm import undefer
 from flask_login import current_user, login_user, logout_user, login_required
 from app import app, db
 from models import ProcessingJob, JobStatus, JobType, FileUpload, User, Subscription, SubscriptionStatus, get_now
 from forms import RegistrationForm, LoginForm
 from queue_manager import get_queue_manager, start_queue_manager
-from pdf_processor import create_zip_archive
-from utils import generate_unique_filename, validate_pdf_file, format_file_size, get_user_display_name
+from pdf_processor import stream_zip_archive, read_pdf_info
+from utils import generate_stored_filename, validate_pdf_file, format_file_size, get_user_display_name, save_file_stream, stat_files, cleanup_old_files, expire_subscriptions
 
 logger = logging.getLogger(__name__)
 
@@ -25,7 +36,15 @@ login_manager.login_message = 'Please log in to access this page.'
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(str(user_id))
+    user_id = str(user_id)
+    # Reuse the user already loaded during this request
+    user = g.get('_loaded_user')
+    if user is not None and user.id == user_id:
+        return user
+    # session.get checks the identity map before issuing a SELECT
+    user = db.session.get(User, user_id)
+    g._loaded_user = user
+    return user
 
 start_queue_manager()
 
@@ -33,6 +52,54 @@ start_queue_manager()
 def make_session_permanent():
     session.permanent = True
 
+# Lapsed subscriptions are expired in bulk at most this often per process (seconds)
+EXPIRE_SUBSCRIPTIONS_INTERVAL = 300
+_subscriptions_expired_at = None
+_expire_subscriptions_lock = threading.Lock()
+
+@app.before_request
+def expire_lapsed_subscriptions():
+    """Run expire_subscriptions periodically so is_premium never outlives a subscription for long"""
+    global _subscriptions_expired_at
+    now = time.monotonic()
+    if _subscriptions_expired_at is not None and now - _subscriptions_expired_at < EXPIRE_SUBSCRIPTIONS_INTERVAL:
+        return
+    # One request runs the update; concurrent ones carry on without waiting
+    if not _expire_subscriptions_lock.acquire(blocking=False):
+        return
+    try:
+        _subscriptions_expired_at = now
+        expire_subscriptions()
+    finally:
+        _expire_subscriptions_lock.release()
+
+# Only small text payloads are worth compressing; PDFs, images and ZIPs are already compressed
+COMPRESS_MIMETYPES = {'application/json'}
+COMPRESS_MIN_SIZE = 500
+
+@app.after_request
+def compress_json_response(response):
+    """Gzip JSON responses for clients that accept it"""
+    if (response.mimetype not in COMPRESS_MIMETYPES
+            or response.direct_passthrough
+            or response.status_code < 200 or response.status_code >= 300
+            or 'Content-Encoding' in response.headers
+            or 'gzip' not in request.headers.get('Accept-Encoding', '').lower()):
+        return response
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+    response.set_data(gzip.compress(data, compresslevel=6))
+    response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    # The gzip body is a different representation, so it gets its own (weak) ETag; the view
+    # compared If-None-Match against the plain one, so re-check against the value clients replay
+    if response.headers.get('ETag'):
+        etag, _ = response.get_etag()
+        response.set_etag(f"{etag}-gzip", weak=True)
+        response = response.make_conditional(request)
+    return response
+
 @app.route('/')
 def index():
     if current_user.is_authenticated:
@@ -64,7 +131,7 @@ def login():
         return redirect(url_for('tools'))
     form = LoginForm()
     if form.validate_on_submit():
-        user = User.query.filter_by(email=form.email.data).first()
+        user = User.query.options(undefer(User.password_hash)).filter_by(email=form.email.data).first()
         if user and user.check_password(form.password.data):
             login_user(user)
             next_page = request.args.get('next')
@@ -92,53 +159,77 @@ def tools():
     user_jobs = ProcessingJob.query.filter_by(user_id=current_user.id).order_by(ProcessingJob.created_at.desc()).limit(10).all()
     return render_template('tools.html', user=current_user, recent_jobs=user_jobs)
 
+# Allowance per file for multipart boundaries and part headers
+UPLOAD_PART_OVERHEAD = 16 * 1024
+
 @app.route('/upload', methods=['POST'])
 @login_required
 def upload_files():
+    is_premium = current_user.is_premium
+    batch_limit = app.config['FREE_USER_BATCH_LIMIT'] if not is_premium else app.config['PREMIUM_USER_BATCH_LIMIT']
+    file_limit = app.config['FREE_USER_FILE_LIMIT'] if not is_premium else app.config['PREMIUM_USER_FILE_LIMIT']
+    # Reject oversized bodies from the header, before the multipart body is parsed
+    upload_limit = min(batch_limit * (file_limit + UPLOAD_PART_OVERHEAD), app.config['MAX_CONTENT_LENGTH'])
+    if request.content_length and request.content_length > upload_limit:
+        return jsonify({'error': f'Upload exceeds {format_file_size(upload_limit)} limit'}), 413
+    # Also bounds chunked bodies that carry no Content-Length
+    request.max_content_length = upload_limit
     if 'files' not in request.files:
         return jsonify({'error': 'No files provided'}), 400
     files = request.files.getlist('files')
     if not files or all(f.filename == '' for f in files):
         return jsonify({'error': 'No files selected'}), 400
-    is_premium = current_user.is_premium
-    batch_limit = app.config['FREE_USER_BATCH_LIMIT'] if not is_premium else app.config['PREMIUM_USER_BATCH_LIMIT']
     if len(files) > batch_limit:
         return jsonify({'error': f'Batch limit exceeded. limit is {batch_limit} files.'}), 400
     uploaded_files = []
+    upload_rows = []
+    saved_paths = []
     total_size = 0
-    file_limit = app.config['FREE_USER_FILE_LIMIT'] if not is_premium else app.config['PREMIUM_USER_FILE_LIMIT']
     for file in files:
         is_valid, message = validate_pdf_file(file)
         if not is_valid:
             return jsonify({'error': f'File {file.filename}: {message}'}), 400
-        file.seek(0, 2)
-        file_size = file.tell()
-        file.seek(0)
-        if file_size > file_limit:
-            return jsonify({'error': f'File {file.filename} exceeds {format_file_size(file_limit)} limit'}), 400
-        total_size += file_size
+    
+    def discard_saved_files():
+        db.session.rollback()
+        for path in saved_paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    
     for file in files:
         try:
-            file_id = str(uuid.uuid4())
-            stored_filename = generate_unique_filename(file.filename)
+            # One random UUID names both the row and the stored file
+            file_uuid = uuid.uuid4()
+            file_id = str(file_uuid)
+            stored_filename = generate_stored_filename(file.filename, file_uuid.hex)
             file_path = os.path.join(app.config['UPLOAD_FOLDER'], stored_filename)
-            file.save(file_path)
-            file.seek(0, 2)
-            current_file_size = file.tell()
-            file.seek(0)
-            file_upload = FileUpload()
-            file_upload.id = file_id
-            file_upload.user_id = current_user.id
-            file_upload.original_filename = file.filename
-            file_upload.stored_filename = stored_filename
-            file_upload.file_size = current_file_size
-            file_upload.file_path = file_path
-            db.session.add(file_upload)
+            # Single pass to disk; the size is counted while copying
+            current_file_size = save_file_stream(file, file_path, file_limit)
+            if current_file_size is None:
+                discard_saved_files()
+                return jsonify({'error': f'File {file.filename} exceeds {format_file_size(file_limit)} limit'}), 413
+            saved_paths.append(file_path)
+            if current_file_size == 0:
+                discard_saved_files()
+                return jsonify({'error': f'File {file.filename}: File is empty'}), 400
+            total_size += current_file_size
+            upload_rows.append({'id': file_id, 'user_id': current_user.id, 'original_filename': file.filename, 'stored_filename': stored_filename, 'file_size': current_file_size, 'file_path': file_path})
             uploaded_files.append({'id': file_id, 'original_filename': file.filename, 'file_size': current_file_size, 'formatted_size': format_file_size(current_file_size)})
         except Exception as e:
             logger.error(f"Error saving file {file.filename}: {str(e)}")
+            discard_saved_files()
             return jsonify({'error': f'Error saving file {file.filename}'}), 500
+    # One executemany INSERT for the whole batch
+    db.session.execute(insert(FileUpload), upload_rows)
     db.session.commit()
+    # Read PDF details and render default previews in the background so /file-info and /preview are usually cache hits
+    queue_manager = get_queue_manager()
+    for row in upload_rows:
+        if row['file_path'].lower().endswith('.pdf'):
+            queue_manager.add_file_info_job(row['id'], row['file_path'])
+            queue_manager.add_preview_job(row['file_path'], get_preview_cache_path(row['id'], PREVIEW_DEFAULT_SCALE, PREVIEW_DEFAULT_FORMAT), PREVIEW_DEFAULT_SCALE, PREVIEW_DEFAULT_FORMAT)
     return jsonify({'message': f'Successfully uploaded {len(uploaded_files)} files', 'files': uploaded_files, 'total_size': format_file_size(total_size)})
 
 @app.route('/process', methods=['POST'])
@@ -153,44 +244,107 @@ def process_files():
         job_type = JobType(job_type_str)
     except ValueError:
         return jsonify({'error': 'Invalid job type'}), 400
-    file_uploads = FileUpload.query.filter(FileUpload.id.in_(file_ids), FileUpload.user_id == current_user.id).all()
-    if len(file_uploads) != len(file_ids):
+    # Only the paths are needed, so skip building FileUpload entities
+    rows = db.session.execute(select(FileUpload.id, FileUpload.file_path).where(FileUpload.id.in_(file_ids), FileUpload.user_id == current_user.id)).all()
+    if len(rows) != len(file_ids):
         return jsonify({'error': 'Some files not found or not owned by user'}), 400
-    input_files = [fu.file_path for fu in file_uploads]
+    paths_by_id = dict(rows)
+    input_files = [paths_by_id[file_id] for file_id in file_ids]
     job_id = str(uuid.uuid4())
     job = ProcessingJob()
     job.id = job_id
     job.user_id = current_user.id
     job.job_type = job_type
-    job.input_files = json.dumps(input_files)
+    job.input_files = input_files
     job.total_files = len(input_files)
-    job.settings = json.dumps(data.get('settings', {}))
+    job.settings = data.get('settings', {})
     db.session.add(job)
     db.session.commit()
     queue_manager = get_queue_manager()
-    queue_manager.add_job(job_id)
+    queue_manager.add_jobs([job_id])
     return jsonify({'job_id': job_id, 'message': 'Processing job created successfully'})
 
+def get_user_job(job_id):
+    """Load one of the current user's jobs by primary key, or None"""
+    # session.get checks the identity map before issuing a SELECT
+    job = db.session.get(ProcessingJob, job_id)
+    if job is None or job.user_id != current_user.id:
+        return None
+    return job
+
 @app.route('/job/<job_id>/status')
 @login_required
 def job_status(job_id):
-    job = ProcessingJob.query.filter_by(id=job_id, user_id=current_user.id).first()
+    job = get_user_job(job_id)
     if not job:
         return jsonify({'error': 'Job not found'}), 404
     queue_manager = get_queue_manager()
     status = queue_manager.get_job_status(job_id)
     if status and job.status == JobStatus.COMPLETED and job.output_files:
-        output_files = json.loads(job.output_files)
+        output_files = job.output_files
+        file_stats = stat_files(output_files)
         status['output_files'] = []
         for file_path in output_files:
-            if os.path.exists(file_path):
-                status['output_files'].append({'filename': os.path.basename(file_path), 'path': file_path, 'size': format_file_size(os.path.getsize(file_path))})
+            file_stat = file_stats.get(file_path)
+            if file_stat:
+                status['output_files'].append({'filename': os.path.basename(file_path), 'path': file_path, 'size': format_file_size(file_stat.st_size)})
     return jsonify(status or {'error': 'Job not found'})
 
+# An event stream ends after this long and the browser reconnects, so a stream
+# never pins a worker thread indefinitely
+JOB_EVENTS_MAX_DURATION = 60
+JOB_EVENTS_KEEPALIVE = 15
+# Each open stream holds a gunicorn thread; past this many, clients are told to poll
+# instead so uploads and downloads always have threads left
+JOB_EVENTS_MAX_STREAMS = 4
+_job_event_slots = threading.BoundedSemaphore(JOB_EVENTS_MAX_STREAMS)
+
+@app.route('/job/<job_id>/events')
+@login_required
+def job_events(job_id):
+    """Stream a job's status changes as server-sent events"""
+    if not get_user_job(job_id):
+        return jsonify({'error': 'Job not found'}), 404
+    queue_manager = get_queue_manager()
+    status = queue_manager.get_job_status(job_id)
+    if not status:
+        return jsonify({'error': 'Job not found'}), 404
+    if not _job_event_slots.acquire(blocking=False):
+        return jsonify({'error': 'Too many open event streams'}), 503
+    
+    def event_stream():
+        yield f"data: {json.dumps(status)}\n\n"
+        if status['status'] in queue_manager.TERMINAL_STATUSES:
+            return
+        version = 0
+        last = (status['status'], status['progress'])
+        deadline = time.monotonic() + JOB_EVENTS_MAX_DURATION
+        while time.monotonic() < deadline:
+            event = queue_manager.wait_job_event(job_id, version, JOB_EVENTS_KEEPALIVE)
+            if event is None:
+                # The job may be running in another process; fall back to its stored status
+                update = queue_manager.get_job_status(job_id)
+                if not update or (update['status'], update['progress']) == last:
+                    # Comment line keeps proxies from closing an idle connection
+                    yield ": keepalive\n\n"
+                    continue
+            else:
+                version, update = event
+            last = (update['status'], update['progress'])
+            yield f"data: {json.dumps(update)}\n\n"
+            if update['status'] in queue_manager.TERMINAL_STATUSES:
+                return
+        yield "retry: 1000\n\n"
+    
+    response = Response(event_stream(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # The server closes the response when the stream ends or the client disconnects
+    response.call_on_close(_job_event_slots.release)
+    return response
+
 @app.route('/job/<job_id>/cancel', methods=['POST'])
 @login_required
 def cancel_job(job_id):
-    job = ProcessingJob.query.filter_by(id=job_id, user_id=current_user.id).first()
+    job = get_user_job(job_id)
     if not job:
         return jsonify({'error': 'Job not found'}), 404
     queue_manager = get_queue_manager()
@@ -200,69 +354,110 @@ def cancel_job(job_id):
     else:
         return jsonify({'error': 'Job cannot be cancelled (already processing or completed)'}), 400
 
-def create_zip_archive(file_paths, zip_filename, job_id=None):
-    """Create a ZIP archive of processed files"""
-    import zipfile
-    import os
-    from flask import current_app
-    
-    processed_dir = current_app.config['PROCESSED_FOLDER']
-    if job_id:
-        # If job_id is provided, we can find the specific output directory
-        # This assumes we know the user_id or can find the job to get it
-        from models import ProcessingJob
-        job = ProcessingJob.query.get(job_id)
-        if job:
-            job_dir = os.path.join(processed_dir, str(job.user_id), str(job_id))
-            zip_path = os.path.join(job_dir, zip_filename)
-        else:
-            zip_path = os.path.join(processed_dir, zip_filename)
-    else:
-        zip_path = os.path.join(processed_dir, zip_filename)
-        
-    with zipfile.ZipFile(zip_path, 'w') as zipf:
-        for file_path in file_paths:
-            if os.path.exists(file_path):
-                zipf.write(file_path, os.path.basename(file_path))
-    return zip_path
+def get_job_outputs(job_id):
+    """Fetch only the status and output files of one of the current user's jobs"""
+    return db.session.execute(select(ProcessingJob.status, ProcessingJob.output_files).where(ProcessingJob.id == job_id, ProcessingJob.user_id == current_user.id)).first()
+
+def find_output_file(output_files, filename):
+    """Return the output path whose basename is exactly filename, if any"""
+    # Path(...).name drops any directory part a crafted filename might carry
+    safe_name = Path(filename).name
+    return {os.path.basename(file_path): file_path for file_path in output_files}.get(safe_name)
+
+def send_download(file_path):
+    """Send a processed file as an attachment, handing the transfer to nginx when configured"""
+    accel_prefix = app.config.get('X_ACCEL_REDIRECT_PREFIX')
+    processed_folder = os.path.realpath(app.config['PROCESSED_FOLDER'])
+    real_path = os.path.realpath(file_path)
+    if accel_prefix and os.path.commonpath([processed_folder, real_path]) == processed_folder:
+        relative_path = os.path.relpath(real_path, processed_folder)
+        response = Response(mimetype=mimetypes.guess_type(real_path)[0] or 'application/octet-stream')
+        response.headers.set('Content-Disposition', 'attachment', filename=os.path.basename(real_path))
+        response.headers['X-Accel-Redirect'] = f"{accel_prefix.rstrip('/')}/{quote(relative_path)}"
+        return response
+    return send_file(file_path, as_attachment=True, conditional=True)
 
 @app.route('/download/<job_id>')
 @login_required
 def download_job_results(job_id):
-    job = ProcessingJob.query.filter_by(id=job_id, user_id=current_user.id).first()
+    job = get_job_outputs(job_id)
     if not job or job.status != JobStatus.COMPLETED:
         abort(404)
     if not job.output_files:
         abort(404)
-    output_files = json.loads(job.output_files)
+    output_files = job.output_files
     if not output_files:
         abort(404)
         
+    # One directory scan instead of a stat per output file
+    file_stats = stat_files(output_files)
+    existing_files = [file_path for file_path in output_files if file_path in file_stats]
+    if not existing_files:
+        abort(404)
     if len(output_files) == 1:
-        file_path = output_files[0]
-        if os.path.exists(file_path):
-            return send_file(file_path, as_attachment=True)
-            
+        return send_download(existing_files[0])
+    # Stream the archive straight into the response instead of building it on disk first
     zip_filename = f"results_{job_id}.zip"
-    zip_path = create_zip_archive(output_files, zip_filename, job_id=job_id)
-    if os.path.exists(zip_path):
-        return send_file(zip_path, as_attachment=True, download_name=zip_filename)
-    abort(404)
+    return Response(stream_zip_archive(existing_files), mimetype='application/zip', headers={'Content-Disposition': f'attachment; filename="{zip_filename}"'})
 
 @app.route('/download/file/<job_id>/<filename>')
 @login_required
 def download_single_file(job_id, filename):
-    job = ProcessingJob.query.filter_by(id=job_id, user_id=current_user.id).first()
+    job = get_job_outputs(job_id)
     if not job or job.status != JobStatus.COMPLETED:
         abort(404)
     if not job.output_files:
         abort(404)
-    output_files = json.loads(job.output_files)
-    for file_path in output_files:
-        if os.path.basename(file_path) == filename:
-            if os.path.exists(file_path):
-                return send_file(file_path, as_attachment=True)
-    abort(404)
+    file_path = find_output_file(job.output_files, filename)
+    if not file_path or not os.path.isfile(file_path):
+        abort(404)
+    return send_download(file_path)
+
+PREVIEW_MIN_SCALE = 0.5
+PREVIEW_MAX_SCALE = 2.0
+PREVIEW_DEFAULT_SCALE = 1.0
+PREVIEW_DEFAULT_FORMAT = 'jpeg'
+PREVIEW_MIMETYPES = {'jpeg': 'image/jpeg', 'png': 'image/png'}
+
+def get_preview_options():
+    """Read the preview scale (?s=) and image format (?format=png for lossless) from the request"""
+    try:
+        scale = float(request.args.get('s', PREVIEW_DEFAULT_SCALE))
+    except ValueError:
+        scale = PREVIEW_DEFAULT_SCALE
+    if not math.isfinite(scale):
+        scale = PREVIEW_DEFAULT_SCALE
+    scale = round(min(max(scale, PREVIEW_MIN_SCALE), PREVIEW_MAX_SCALE), 2)
+    image_format = 'png' if request.args.get('format') == 'png' else PREVIEW_DEFAULT_FORMAT
+    return scale, image_format
+
+def get_preview_cache_path(cache_key, zoom, image_format):
+    """Path of the cached preview image for a file at the given scale and format"""
+    return os.path.join(app.config['PREVIEW_FOLDER'], f"{cache_key}_{zoom}.{image_format}")
+
+def send_cached_preview(cache_key, file_path, zoom, image_format='jpeg'):
+    """Serve a cached preview, or queue its rendering and answer 202 until it is ready.
+    
+    Returns None if the preview could not be rendered (e.g. the document has no pages).
+    """
+    cache_path = get_preview_cache_path(cache_key, zoom, image_format)
+    try:
+        # send_file stats the path itself, so a missing cache entry surfaces here without a separate exists()
+        response = send_file(cache_path, mimetype=PREVIEW_MIMETYPES[image_format], conditional=True)
+    except FileNotFoundError:
+        queue_manager = get_queue_manager()
+        if queue_manager.preview_failed(cache_path):
+            return None
+        queue_manager.add_preview_job(file_path, cache_path, zoom, image_format)
+        response = jsonify({'status': 'pending', 'message': 'Preview is being generated'})
+        response.status_code = 202
+        response.headers['Retry-After'] = '1'
+        return response
+    # Previews never change for a given file; they are per-user, so keep them out of shared caches
+    response.cache_control.private = True
+    response.cache_control.max_age = 86400
+    response.cache_control.immutable = True
+    return response
 
 @app.route('/preview/<file_id>')
 @login_required
@@ -270,20 +465,15 @@ def preview_file(file_id):
     file_upload = FileUpload.query.filter_by(id=file_id, user_id=current_user.id).first()
     if not file_upload:
         abort(404)
+    zoom, image_format = get_preview_options()
     try:
-        import fitz
-        pdf_document = fitz.open(file_upload.file_path)
-        if pdf_document.page_count > 0:
-            page = pdf_document[0]
-            pix = page.get_pixmap(matrix=fitz.Matrix(1.5, 1.5))
-            img_data = pix.tobytes("png")
-            pdf_document.close()
-            return Response(img_data, mimetype='image/png')
-        else:
-            abort(404)
+        response = send_cached_preview(file_upload.id, file_upload.file_path, zoom, image_format)
     except Exception as e:
         logger.error(f"Error generating preview for file {file_id}: {str(e)}")
         abort(500)
+    if response is None:
+        abort(404)
+    return response
 
 @app.route('/file-info/<file_id>')
 @login_required
@@ -293,14 +483,20 @@ def file_info(file_id):
         abort(404)
     try:
         file_info = {'id': file_upload.id, 'filename': file_upload.original_filename, 'size': file_upload.file_size, 'formatted_size': format_file_size(file_upload.file_size), 'upload_date': file_upload.created_at.isoformat()}
-        try:
-            from PyPDF2 import PdfReader
-            with open(file_upload.file_path, 'rb') as f:
-                reader = PdfReader(f)
-                file_info.update({'pages': len(reader.pages), 'metadata': reader.metadata._get_object() if reader.metadata else {}, 'encrypted': reader.is_encrypted})
-        except Exception as e:
-            logger.warning(f"Could not read PDF metadata: {str(e)}")
-            file_info.update({'pages': 'Unknown', 'metadata': {}, 'encrypted': False})
+        if file_upload.page_count is not None:
+            file_info.update({'pages': file_upload.page_count, 'metadata': file_upload.pdf_metadata or {}, 'encrypted': bool(file_upload.is_encrypted)})
+        else:
+            # Background task has not run yet (or the upload predates it): read the file now and keep the result
+            try:
+                pdf_info = read_pdf_info(file_upload.file_path)
+                file_info.update(pdf_info)
+                file_upload.page_count = pdf_info['pages']
+                file_upload.is_encrypted = pdf_info['encrypted']
+                file_upload.pdf_metadata = pdf_info['metadata']
+                db.session.commit()
+            except Exception as e:
+                logger.warning(f"Could not read PDF metadata: {str(e)}")
+                file_info.update({'pages': 'Unknown', 'metadata': {}, 'encrypted': False})
         return jsonify(file_info)
     except Exception as e:
         logger.error(f"Error getting file info for {file_id}: {str(e)}")
@@ -315,32 +511,28 @@ def queue_status():
     status['user_jobs'] = []
     for job in user_jobs:
         status['user_jobs'].append({'id': job.id, 'job_type': job.job_type.value, 'status': job.status.value, 'progress': job.progress, 'created_at': job.created_at.isoformat()})
-    return jsonify(status)
+    # Pollers that already have this exact status get an empty 304
+    response = jsonify(status)
+    response.add_etag()
+    return response.make_conditional(request)
 
 @app.route('/preview-processed/<job_id>/<filename>')
 @login_required
 def preview_processed_file(job_id, filename):
     try:
-        job = ProcessingJob.query.filter_by(id=job_id, user_id=current_user.id).first()
+        job = get_user_job(job_id)
         if not job:
             return jsonify({'error': 'Job not found'}), 404
         if job.status != JobStatus.COMPLETED:
             return jsonify({'error': 'Job not completed'}), 400
-        output_files = json.loads(job.output_files) if job.output_files else []
-        file_path = None
-        for file in output_files:
-            if file.endswith(filename):
-                file_path = file
-                break
+        file_path = find_output_file(job.output_files or [], filename)
         if not file_path or not os.path.exists(file_path):
             return jsonify({'error': 'File not found'}), 404
-        import fitz
-        doc = fitz.open(file_path)
-        page = doc[0]
-        pix = page.get_pixmap(matrix=fitz.Matrix(1.2, 1.2))
-        img_data = pix.tobytes("png")
-        doc.close()
-        return Response(img_data, mimetype='image/png')
+        zoom, image_format = get_preview_options()
+        response = send_cached_preview(f"{job.id}_{secure_filename(os.path.basename(file_path))}", file_path, zoom, image_format)
+        if response is None:
+            return jsonify({'error': 'Could not generate preview'}), 404
+        return response
     except Exception as e:
         logger.error(f"Error generating preview for processed file {filename}: {str(e)}")
         return jsonify({'error': 'Could not generate preview'}), 500
@@ -366,9 +558,10 @@ def internal_error(error):
     return render_template('500.html'), 500
 
 def cleanup_files():
-    from utils import cleanup_old_files
+    expire_subscriptions()
     cleanup_old_files(app.config['UPLOAD_FOLDER'])
     cleanup_old_files(app.config['PROCESSED_FOLDER'])
+    cleanup_old_files(app.config['PREVIEW_FOLDER'])
 
 @app.route('/premium')
 @login_required
@@ -390,7 +583,7 @@ def create_premium_subscription():
         subscription = Subscription()
         subscription.id = str(uuid.uuid4())
         subscription.user_id = current_user.id
-        subscription.paypal_subscription_id = "verified_" + str(uuid.uuid4())[:8]
+        subscription.paypal_subscription_id = "verified_" + secrets.token_hex(4)
         subscription.status = SubscriptionStatus.ACTIVE
         subscription.activated_at = get_now()
         subscription.expires_at = get_now() + timedelta(days=30)
@@ -424,7 +617,8 @@ def cancel_subscription():
         flash('Error cancelling subscription. Please contact support.', 'error')
     return redirect(url_for('premium'))
 
-TOOL_CONFIGS = {
+# Read-only: get_tools_by_category caches a grouping of these
+TOOL_CONFIGS = MappingProxyType({
     'merge': {'title': 'Merge PDF', 'category': 'Organize', 'job_type': 'merge', 'multiple': True},
     'split': {'title': 'Split PDF', 'category': 'Organize', 'job_type': 'split', 'multiple': False},
     'compress': {'title': 'Compress PDF', 'category': 'Optimize', 'job_type': 'compress', 'multiple': True},
@@ -454,7 +648,20 @@ TOOL_CONFIGS = {
     'remove-pages': {'title': 'Remove Pages', 'category': 'Organize', 'job_type': 'remove_pages', 'multiple': False},
     'extract-pages': {'title': 'Extract Pages', 'category': 'Organize', 'job_type': 'extract_pages', 'multiple': False},
     'organize': {'title': 'Organize PDF', 'category': 'Organize', 'job_type': 'organize', 'multiple': False},
-}
+})
+
+@functools.lru_cache(maxsize=1)
+def get_tools_by_category():
+    """Group TOOL_CONFIGS by category once; needs an app context for url_for"""
+    tools_by_category = {}
+    for tool_id, config in TOOL_CONFIGS.items():
+        tools_by_category.setdefault(config['category'], []).append({**config, 'id': tool_id, 'url': url_for('tool_page', tool_id=tool_id)})
+    return tools_by_category
+
+@app.route('/all-tools')
+@login_required
+def all_tools():
+    return render_template('all-tools.html', tools_by_category=get_tools_by_category())
 
 @app.route('/tool/<tool_id>', methods=['GET', 'POST'])
 @login_required
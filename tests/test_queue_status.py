@@ -0,0 +1,58 @@
+import unittest
+import uuid
+
+from app import app, db
+from models import User
+import routes  # noqa: F401
+
+
+class QueueStatusETagTest(unittest.TestCase):
+    def setUp(self):
+        app.config['WTF_CSRF_ENABLED'] = False
+        self.client = app.test_client()
+        with app.app_context():
+            user = User()
+            user.id = str(uuid.uuid4())
+            user.email = f"{user.id}@example.com"
+            user.first_name = 'Test'
+            user.last_name = 'User'
+            user.set_password('password')
+            db.session.add(user)
+            db.session.commit()
+            self.user_id = user.id
+        with self.client.session_transaction() as sess:
+            sess['_user_id'] = self.user_id
+            sess['_fresh'] = True
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.delete(db.session.get(User, self.user_id))
+            db.session.commit()
+
+    def assert_replayed_etag_is_not_modified(self, headers):
+        first = self.client.get('/api/queue/status', headers=headers)
+        self.assertEqual(first.status_code, 200)
+        etag = first.headers['ETag']
+        self.assertTrue(etag)
+
+        second = self.client.get('/api/queue/status', headers={**headers, 'If-None-Match': etag})
+        self.assertEqual(second.status_code, 304)
+        return first
+
+    def test_plain_etag_round_trip(self):
+        self.assert_replayed_etag_is_not_modified({})
+
+    def test_gzip_etag_round_trip(self):
+        # An idle queue status is small, so lower the threshold to get it gzipped
+        original = routes.COMPRESS_MIN_SIZE
+        routes.COMPRESS_MIN_SIZE = 1
+        try:
+            first = self.assert_replayed_etag_is_not_modified({'Accept-Encoding': 'gzip'})
+        finally:
+            routes.COMPRESS_MIN_SIZE = original
+        self.assertEqual(first.headers['Content-Encoding'], 'gzip')
+        self.assertTrue(first.headers['ETag'].startswith('W/'))
+
+
+if __name__ == '__main__':
+    unittest.main()
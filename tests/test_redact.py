@@ -0,0 +1,76 @@
+import os
+import unittest
+import uuid
+
+import fitz
+
+from app import app, db
+from models import User, FileUpload, ProcessingJob, JobStatus, JobType
+from pdf_processor import PDFProcessor
+
+
+class RedactPdfTest(unittest.TestCase):
+    def setUp(self):
+        self.ctx = app.app_context()
+        self.ctx.push()
+        user = User()
+        user.id = str(uuid.uuid4())
+        user.email = f"{user.id}@example.com"
+        user.first_name = 'Test'
+        user.last_name = 'User'
+        user.is_premium = True
+        user.set_password('password')
+        db.session.add(user)
+        self.user = user
+
+        os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+        self.pdf_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{uuid.uuid4().hex}.pdf")
+        with fitz.open() as doc:
+            doc.new_page().insert_text((72, 72), "Public text and a secret code")
+            doc.save(self.pdf_path)
+        db.session.add(FileUpload(
+            id=str(uuid.uuid4()), user_id=user.id, original_filename='report.pdf',
+            stored_filename=os.path.basename(self.pdf_path),
+            file_size=os.path.getsize(self.pdf_path), file_path=self.pdf_path,
+        ))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.rollback()
+        ProcessingJob.query.filter_by(user_id=self.user.id).delete()
+        FileUpload.query.filter_by(user_id=self.user.id).delete()
+        db.session.delete(self.user)
+        db.session.commit()
+        self.ctx.pop()
+
+    def run_job(self, settings):
+        job = ProcessingJob(
+            id=str(uuid.uuid4()), user_id=self.user.id, job_type=JobType.REDACT,
+            status=JobStatus.PENDING, input_files=[self.pdf_path], settings=settings, total_files=1,
+        )
+        db.session.add(job)
+        db.session.commit()
+        return job, PDFProcessor(job.id)
+
+    def test_keyword_is_removed(self):
+        # The tool form sends keywords as one comma-separated string
+        job, processor = self.run_job({'keywords': 'secret, missing'})
+        output_files = processor.process_job()
+
+        self.assertEqual(job.status, JobStatus.COMPLETED)
+        self.assertEqual(len(output_files), 1)
+        with fitz.open(output_files[0]) as doc:
+            text = doc[0].get_text()
+        self.assertNotIn('secret', text)
+        self.assertIn('Public', text)
+
+    def test_job_without_output_fails(self):
+        os.remove(self.pdf_path)
+        job, processor = self.run_job({'keywords': 'secret'})
+        with self.assertRaises(Exception):
+            processor.process_job()
+        self.assertEqual(job.status, JobStatus.FAILED)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,8 @@
 import os
+import mmap
 import uuid
 import hashlib
+import secrets
 from datetime import datetime
 from werkzeug.utils import secure_filename
 
@@ -8,17 +10,76 @@ def generate_unique_filename(original_filename):
     """Generate a unique filename while preserving the extension"""
     filename = secure_filename(original_filename)
     name, ext = os.path.splitext(filename)
-    unique_id = str(uuid.uuid4())[:8]
+    unique_id = secrets.token_hex(4)
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     return f"{name}_{timestamp}_{unique_id}{ext}"
 
+def generate_stored_filename(original_filename, unique_id=None):
+    """Generate an opaque on-disk name for an upload, keeping only the extension"""
+    ext = os.path.splitext(original_filename)[1].lower()[:8]
+    if not ext[1:].isalnum():
+        ext = '.pdf'
+    return f"{unique_id or uuid.uuid4().hex}{ext}"
+
 def get_file_hash(file_path):
-    """Calculate MD5 hash of a file"""
-    hash_md5 = hashlib.md5()
+    """Calculate the BLAKE2b hash of a file"""
+    file_hash = hashlib.blake2b()
     with open(file_path, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            hash_md5.update(chunk)
-    return hash_md5.hexdigest()
+        try:
+            # Hash straight from the page cache without copying into Python buffers
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                file_hash.update(mm)
+        except (ValueError, OSError):
+            # Empty files cannot be mapped; fall back to buffered reads
+            buf = bytearray(1 << 20)
+            view = memoryview(buf)
+            while n := f.readinto(buf):
+                file_hash.update(view[:n])
+    return file_hash.hexdigest()
+
+# Large buffer for upload copies: fewer read/write calls on multi-megabyte PDFs
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+def save_file_stream(file, file_path, max_size, chunk_size=UPLOAD_CHUNK_SIZE):
+    """Copy an uploaded file to disk in chunks, enforcing max_size as bytes arrive.
+    
+    Returns the number of bytes written, or None if the file exceeded max_size
+    (the partial file is removed).
+    """
+    written = 0
+    with open(file_path, 'wb') as out:
+        for chunk in iter(lambda: file.stream.read(chunk_size), b""):
+            written += len(chunk)
+            if written > max_size:
+                break
+            out.write(chunk)
+    if written > max_size:
+        os.remove(file_path)
+        return None
+    return written
+
+def stat_files(file_paths):
+    """Stat many files with one directory scan per parent directory.
+    
+    Returns a dict mapping each existing regular file path to its os.stat_result;
+    missing files are left out.
+    """
+    wanted = {}
+    for file_path in file_paths:
+        directory, name = os.path.split(file_path)
+        wanted.setdefault(directory, {})[name] = file_path
+    
+    stats = {}
+    for directory, names in wanted.items():
+        try:
+            with os.scandir(directory or '.') as entries:
+                for entry in entries:
+                    file_path = names.get(entry.name)
+                    if file_path is not None and entry.is_file():
+                        stats[file_path] = entry.stat()
+        except OSError:
+            continue
+    return stats
 
 def cleanup_old_files(directory, max_age_hours=24):
     """Remove files older than max_age_hours from a directory and database records"""
@@ -27,70 +88,82 @@ def cleanup_old_files(directory, max_age_hours=24):
     from datetime import datetime, timedelta
     
     now = datetime.now()
-    max_age_seconds = max_age_hours * 3600
     cutoff_time = now - timedelta(hours=max_age_hours)
+    cutoff_ts = cutoff_time.timestamp()
     
-    # 1. Cleanup Physical Files
-    for filename in os.listdir(directory):
-        file_path = os.path.join(directory, filename)
-        if os.path.isfile(file_path):
-            file_age = now - datetime.fromtimestamp(os.path.getmtime(file_path))
-            if file_age.total_seconds() > max_age_seconds:
-                try:
-                    os.remove(file_path)
-                except OSError:
-                    pass
+    # 1. Cleanup Physical Files (scandir entries carry the file type, so only one stat per file)
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            try:
+                if entry.is_file(follow_symlinks=False) and entry.stat(follow_symlinks=False).st_mtime < cutoff_ts:
+                    os.remove(entry.path)
+            except OSError:
+                pass
 
     # 2. Cleanup Database Records (Recent Jobs/History)
     with app.app_context():
         try:
-            # Delete old processing jobs
-            old_jobs = ProcessingJob.query.filter(ProcessingJob.created_at < cutoff_time).all()
-            for job in old_jobs:
-                db.session.delete(job)
-            
-            # Delete old file uploads
-            old_uploads = FileUpload.query.filter(FileUpload.created_at < cutoff_time).all()
-            for upload in old_uploads:
-                db.session.delete(upload)
-                
+            # One DELETE per table instead of loading and deleting each row
+            ProcessingJob.query.filter(ProcessingJob.created_at < cutoff_time).delete(synchronize_session=False)
+            FileUpload.query.filter(FileUpload.created_at < cutoff_time).delete(synchronize_session=False)
             db.session.commit()
         except Exception as e:
             db.session.rollback()
             print(f"Error during DB cleanup: {e}")
 
+def expire_subscriptions():
+    """Expire lapsed subscriptions and clear is_premium for users left without an active one"""
+    from app import db, app
+    from models import User, Subscription, SubscriptionStatus
+    from sqlalchemy import select, update, exists
+    
+    with app.app_context():
+        try:
+            now = datetime.now()
+            db.session.execute(
+                update(Subscription)
+                .where(Subscription.status == SubscriptionStatus.ACTIVE, Subscription.expires_at < now)
+                .values(status=SubscriptionStatus.EXPIRED)
+            )
+            still_active = exists().where(Subscription.user_id == User.id, Subscription.status == SubscriptionStatus.ACTIVE)
+            lapsed_users = select(Subscription.user_id).where(Subscription.status == SubscriptionStatus.EXPIRED)
+            db.session.execute(
+                update(User)
+                .where(User.is_premium.is_(True), User.id.in_(lapsed_users), ~still_active)
+                .values(is_premium=False)
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error during subscription expiry: {e}")
+
+FILE_SIZE_UNITS = ("B", "KB", "MB", "GB")
+
 def format_file_size(size_bytes):
     """Format file size in human readable format"""
-    if size_bytes == 0:
+    size_bytes = int(size_bytes)
+    if size_bytes <= 0:
         return "0 B"
     
-    size_names = ["B", "KB", "MB", "GB"]
-    i = 0
-    while size_bytes >= 1024 and i < len(size_names) - 1:
-        size_bytes /= 1024.0
-        i += 1
-    
-    return f"{size_bytes:.1f} {size_names[i]}"
+    # Each unit is 2**10 times the previous one, so the bit length picks it directly
+    i = min((size_bytes.bit_length() - 1) // 10, len(FILE_SIZE_UNITS) - 1)
+    return f"{size_bytes / (1 << (10 * i)):.1f} {FILE_SIZE_UNITS[i]}"
+
+ALLOWED_UPLOAD_EXTENSIONS = frozenset({'pdf', 'jpg', 'jpeg', 'png', 'docx', 'pptx', 'xlsx', 'html'})
 
 def validate_pdf_file(file):
     """Validate that uploaded file is a supported format"""
     if not file or not file.filename:
         return False, "No file selected"
     
-    allowed_extensions = {'.pdf', '.jpg', '.jpeg', '.png', '.docx', '.pptx', '.xlsx', '.html'}
-    ext = os.path.splitext(file.filename)[1].lower()
-    
-    if ext not in allowed_extensions:
-        return False, f"Unsupported file format: {ext}"
-    
-    # Check file size
-    file.seek(0, 2)  # Seek to end
-    file_size = file.tell()
-    file.seek(0)  # Reset to beginning
+    _, dot, ext = file.filename.rpartition('.')
+    ext = ext.lower() if dot else ''
     
-    if file_size == 0:
-        return False, "File is empty"
+    if ext not in ALLOWED_UPLOAD_EXTENSIONS:
+        return False, f"Unsupported file format: .{ext}" if ext else "Unsupported file format: "
     
+    # Size limits (including empty files) are enforced while the upload is saved
     return True, "Valid file format"
 
 def get_user_display_name(user):
@@ -1,10 +1,17 @@
 import os
+import re
 import logging
 import mimetypes
 from werkzeug.utils import secure_filename
 
 logger = logging.getLogger(__name__)
 
+# PDF files start with %PDF-
+PDF_SIGNATURE = b'%PDF-'
+
+# Path separators, '..' traversal, and control characters other than tab/newline/carriage return
+UNSAFE_FILENAME_RE = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f/\\]|\.\.')
+
 class FileValidator:
     def __init__(self):
         self.allowed_extensions = {'.pdf'}
@@ -29,18 +36,10 @@ class FileValidator:
             if file_ext not in self.allowed_extensions:
                 return False, f"Invalid file type. Only PDF files are allowed. Got: {file_ext}"
             
-            # Check MIME type
-            file.seek(0)  # Reset file pointer
-            file_content = file.read(1024)  # Read first 1KB
-            file.seek(0)  # Reset file pointer
-            
-            # Check PDF signature
-            if not self._is_pdf_signature(file_content):
-                return False, "File doesn't appear to be a valid PDF"
-            
-            # Check file size
-            file.seek(0, os.SEEK_END)
-            file_size = file.tell()
+            # Check file size first so rejected uploads are never read
+            # (seek returns the new offset, so no tell() is needed; fileno() would force a
+            # SpooledTemporaryFile onto disk)
+            file_size = file.seek(0, os.SEEK_END)
             file.seek(0)  # Reset file pointer
             
             if file_size > self.max_file_size:
@@ -49,6 +48,14 @@ class FileValidator:
             if file_size < self.min_file_size:
                 return False, "File too small. Minimum size: 100 bytes"
             
+            # Only the signature bytes are needed from the content
+            file_content = file.read(len(PDF_SIGNATURE))
+            file.seek(0)
+            
+            # Check PDF signature
+            if not self._is_pdf_signature(file_content):
+                return False, "File doesn't appear to be a valid PDF"
+            
             # Additional security checks
             if not self._security_check(filename):
                 return False, "Filename contains invalid characters"
@@ -61,35 +68,8 @@ class FileValidator:
     
     def _is_pdf_signature(self, file_content):
         """Check if file has PDF signature"""
-        try:
-            # PDF files start with %PDF-
-            if file_content.startswith(b'%PDF-'):
-                return True
-            return False
-        except:
-            return False
+        return file_content[:len(PDF_SIGNATURE)] == PDF_SIGNATURE
     
     def _security_check(self, filename):
         """Additional security checks for filename"""
-        try:
-            # Check for path traversal attempts
-            if '..' in filename or '/' in filename or '\\' in filename:
-                return False
-            
-            # Check for null bytes
-            if '\x00' in filename:
-                return False
-            
-            # Check for control characters
-            if any(ord(c) < 32 for c in filename if c not in '\t\n\r'):
-                return False
-            
-            # Check filename length
-            if len(filename) > 255:
-                return False
-            
-            return True
-        
-        except Exception as e:
-            logger.error(f"Error in security check: {str(e)}")
-            return False
+        return len(filename) <= 255 and UNSAFE_FILENAME_RE.search(filename) is None
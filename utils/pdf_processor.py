@@ -1,39 +1,311 @@
+import io
 import os
+import json
+import uuid
+import hashlib
+import itertools
 import logging
+import threading
 import PyPDF2
 import pdfplumber
 from io import BytesIO
 import zipfile
 import tempfile
+from functools import partial, lru_cache
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
+
+# PyMuPDF does merge/split/rotate/compress in C; PyPDF2 remains the fallback
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
 
 logger = logging.getLogger(__name__)
 
+# PdfWriter emits many small writes; batch them into few large syscalls
+PDF_WRITE_BUFFER_SIZE = 4 << 20
+
+def _open_buffered(path):
+    """Open path for binary writing with a large write buffer"""
+    return open(path, 'wb', buffering=PDF_WRITE_BUFFER_SIZE)
+
+# A merge keeps every page of its output in memory until it is written, so cap how many
+# worker threads can be building one at a time
+MERGE_CONCURRENCY = 4
+_merge_slots = threading.Semaphore(MERGE_CONCURRENCY)
+
+# Extraction cache budget, enforced every CACHE_GC_INTERVAL result writes
+CACHE_MAX_BYTES = 1_000_000_000
+CACHE_GC_INTERVAL = 100
+_cache_writes = itertools.count(1)
+
+# Below this many pages, starting worker processes costs more than it saves
+PARALLEL_EXTRACT_MIN_PAGES = 4
+
+def _page_text(page):
+    """Text of a pdfplumber or PyMuPDF page"""
+    if fitz is not None and isinstance(page, fitz.Page):
+        return page.get_text()
+    return page.extract_text()
+
+def _page_text_or_fallback(page, pdf_path, page_num):
+    """Text of one page, re-extracting just that page with PyPDF2 if the main extractor fails on it"""
+    try:
+        return _page_text(page)
+    except Exception as e:
+        logger.warning(f"Page {page_num + 1} extraction failed, trying PyPDF2: {str(e)}")
+        with open(pdf_path, 'rb') as file:
+            return PyPDF2.PdfReader(file).pages[page_num].extract_text()
+
+def _extract_page_text(pdf_path, page_num, text_only=False):
+    """Extract the text of one page (0-based); top-level so worker processes can pickle it"""
+    if text_only and fitz is not None:
+        with fitz.open(pdf_path) as doc:
+            return page_num, _page_text_or_fallback(doc[page_num], pdf_path, page_num)
+    # pages= makes pdfplumber parse only the requested page
+    with pdfplumber.open(pdf_path, pages=[page_num + 1]) as pdf:
+        return page_num, _page_text_or_fallback(pdf.pages[0], pdf_path, page_num)
+
+def _file_hash(path, chunk_size=1 << 20):
+    """Fingerprint a file's contents for cache keys"""
+    file_hash = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+METADATA_FIELDS = (
+    ('title', '/Title'),
+    ('author', '/Author'),
+    ('subject', '/Subject'),
+    ('creator', '/Creator'),
+    ('producer', '/Producer'),
+    ('creation_date', '/CreationDate'),
+    ('modification_date', '/ModDate'),
+)
+
+def _read_metadata(pdf_path):
+    """Read page count, document info and encryption flag with PyPDF2"""
+    metadata = {}
+    with open(pdf_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        
+        # Basic info
+        metadata['page_count'] = len(pdf_reader.pages)
+        metadata['file_size'] = os.path.getsize(pdf_path)
+        
+        # PDF metadata
+        pdf_metadata = pdf_reader.metadata or {}
+        for key, pdf_key in METADATA_FIELDS:
+            metadata[key] = pdf_metadata.get(pdf_key, 'N/A')
+        
+        # Additional info
+        metadata['encrypted'] = pdf_reader.is_encrypted
+    return metadata
+
+@lru_cache(maxsize=512)
+def _metadata_cached(path, mtime_ns, size):
+    """Memoised _read_metadata; mtime and size change whenever the file is rewritten"""
+    return _read_metadata(path)
+
+class _BoundedText:
+    """Newline-join text chunks into a buffer, stopping once a length limit is hit"""
+    TRUNCATION_NOTE = "\n\n[Text truncated due to length limit]"
+    
+    def __init__(self, limit):
+        self.buf = io.StringIO()
+        self.length = 0
+        self.limit = limit
+        self.truncated = False
+    
+    def add(self, chunk):
+        """Append a chunk; returns False once the limit was reached and nothing more fits"""
+        if self.length:
+            chunk = "\n" + chunk
+        remaining = self.limit - self.length
+        if len(chunk) > remaining:
+            self.buf.write(chunk[:remaining])
+            self.length = self.limit
+            self.truncated = True
+            return False
+        self.buf.write(chunk)
+        self.length += len(chunk)
+        return True
+    
+    def getvalue(self):
+        text = self.buf.getvalue()
+        return text + self.TRUNCATION_NOTE if self.truncated else text
+
 class PDFProcessor:
     def __init__(self):
         self.max_pages = 1000  # Limit for safety
         self.max_text_length = 1000000  # 1MB text limit
+        self.num_workers = min(os.cpu_count() or 1, 4)
+        # Text-only extraction goes through MuPDF's text device, which skips the path/fill/colour
+        # operators pdfminer would turn into layout objects; pdfplumber is used when False
+        self.text_only = True
+        # Extraction results keyed by content hash, so re-uploads of the same file skip parsing
+        self.cache_dir = os.path.join(tempfile.gettempdir(), 'snappdf_cache')
+        os.makedirs(self.cache_dir, exist_ok=True)
+    
+    def _read_cache(self, cache_path):
+        """Load a cached result, or None if missing or unreadable"""
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def _write_cache(self, cache_path, result):
+        """Store a result atomically so readers never see a partial file"""
+        tmp_path = f"{cache_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(result, f, default=str)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            logger.warning(f"Could not write cache {cache_path}: {str(e)}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+        
+        if next(_cache_writes) % CACHE_GC_INTERVAL == 0:
+            self._cache_gc()
+    
+    def _cache_gc(self, max_bytes=CACHE_MAX_BYTES):
+        """Delete least recently used cache files until the cache fits in max_bytes"""
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_atime, st.st_size, path))
+                total += st.st_size
+        
+        if total <= max_bytes:
+            return
+        
+        entries.sort()
+        for _, size, path in entries:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= max_bytes:
+                break
+    
+    @property
+    def _use_mupdf(self):
+        return self.text_only and fitz is not None
+    
+    @property
+    def _engine(self):
+        # The two extractors lay text out differently, so they get separate entries
+        return 'mupdf' if self._use_mupdf else 'plumber'
+    
+    def _cache_file_dir(self, file_hash):
+        """Per-file cache directory, sharded by hash prefix to keep directories small"""
+        return os.path.join(self.cache_dir, file_hash[:2], file_hash[2:])
+    
+    def _page_cache_path(self, file_hash, page_num):
+        return os.path.join(self._cache_file_dir(file_hash), f"p{page_num}.{self._engine}.txt")
+    
+    def _read_page_cache(self, file_hash, page_num):
+        """Cached text of one page ('' for a page without text), or None if not cached"""
+        try:
+            with open(self._page_cache_path(file_hash, page_num), 'r', encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return None
     
-    def extract_text(self, pdf_path):
+    def _write_page_cache(self, file_hash, page_num, page_text):
+        """Store one page's text atomically"""
+        cache_path = self._page_cache_path(file_hash, page_num)
+        tmp_path = f"{cache_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(page_text)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            logger.warning(f"Could not write page cache {cache_path}: {str(e)}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+    
+    def extract_page_text(self, pdf_path, page_num, file_hash=None):
+        """Extract the text of a single page (0-based), served from the page cache when possible"""
+        file_hash = file_hash or _file_hash(pdf_path)
+        page_text = self._read_page_cache(file_hash, page_num)
+        if page_text is None:
+            _, page_text = _extract_page_text(pdf_path, page_num, self.text_only)
+            page_text = page_text or ''
+            self._write_page_cache(file_hash, page_num, page_text)
+        return page_text
+    
+    def _iter_page_texts(self, pdf_path, file_hash, pages, page_texts, missing, parallel):
+        """Yield (page_num, text) in page order, extracting uncached pages only as they are reached"""
+        # Parallel runs hand out a few pages per worker at a time so an early stop wastes little work
+        batch_size = self.num_workers * 2
+        next_missing = 0
+        with ProcessPoolExecutor(max_workers=self.num_workers) if parallel else nullcontext() as executor:
+            for page_num, page_text in page_texts.items():
+                if page_text is None:
+                    if parallel:
+                        # pdfminer is pure Python and CPU-bound, so spread pages over processes
+                        batch = missing[next_missing:next_missing + batch_size]
+                        next_missing += len(batch)
+                        extracted = executor.map(partial(_extract_page_text, pdf_path), batch)
+                    else:
+                        extracted = [(page_num, _page_text_or_fallback(pages[page_num], pdf_path, page_num))]
+                    for extracted_num, extracted_text in extracted:
+                        page_texts[extracted_num] = extracted_text or ''
+                        self._write_page_cache(file_hash, extracted_num, page_texts[extracted_num])
+                yield page_num, page_texts[page_num]
+    
+    def extract_text(self, pdf_path, force_refresh=False):
         """Extract text from PDF using both PyPDF2 and pdfplumber for better reliability"""
         try:
-            text_content = []
+            file_hash = _file_hash(pdf_path)
+            use_mupdf = self._use_mupdf
+            cache_path = os.path.join(self._cache_file_dir(file_hash), f"text.{self._engine}.json")
+            if not force_refresh:
+                cached = self._read_cache(cache_path)
+                if cached is not None:
+                    return cached
+            
+            text_content = _BoundedText(self.max_text_length)
             page_count = 0
             
-            # First try with pdfplumber (better for complex layouts)
+            # First try with MuPDF or pdfplumber (better for complex layouts)
             try:
-                with pdfplumber.open(pdf_path) as pdf:
-                    for page_num, page in enumerate(pdf.pages):
-                        if page_num >= self.max_pages:
+                with (fitz.open(pdf_path) if use_mupdf else pdfplumber.open(pdf_path)) as pdf:
+                    pages = pdf if use_mupdf else pdf.pages
+                    page_count = min(len(pages), self.max_pages)
+                    # Pages extracted before (e.g. by extract_page_text) come from the page cache
+                    page_texts = {page_num: None if force_refresh else self._read_page_cache(file_hash, page_num) for page_num in range(page_count)}
+                    missing = [page_num for page_num, page_text in page_texts.items() if page_text is None]
+                    # MuPDF is native code and fast enough in-process
+                    parallel = not use_mupdf and len(missing) >= PARALLEL_EXTRACT_MIN_PAGES and self.num_workers >= 2
+                    
+                    for page_num, page_text in self._iter_page_texts(pdf_path, file_hash, pages, page_texts, missing, parallel):
+                        # Stop extracting pages once the length limit is reached
+                        if page_text and not text_content.add(f"--- Page {page_num + 1} ---\n{page_text}\n"):
                             break
-                        
-                        page_text = page.extract_text()
-                        if page_text:
-                            text_content.append(f"--- Page {page_num + 1} ---\n{page_text}\n")
-                        page_count += 1
             except Exception as e:
-                logger.warning(f"pdfplumber failed, trying PyPDF2: {str(e)}")
+                logger.warning(f"{'MuPDF' if use_mupdf else 'pdfplumber'} failed, trying PyPDF2: {str(e)}")
                 
                 # Fallback to PyPDF2
+                text_content = _BoundedText(self.max_text_length)
                 with open(pdf_path, 'rb') as file:
                     pdf_reader = PyPDF2.PdfReader(file)
                     page_count = len(pdf_reader.pages)
@@ -44,21 +316,20 @@ class PDFProcessor:
                     for page_num in range(page_count):
                         page = pdf_reader.pages[page_num]
                         page_text = page.extract_text()
-                        if page_text:
-                            text_content.append(f"--- Page {page_num + 1} ---\n{page_text}\n")
-            
-            full_text = "\n".join(text_content)
+                        # Stop parsing pages once the length limit is reached
+                        if page_text and not text_content.add(f"--- Page {page_num + 1} ---\n{page_text}\n"):
+                            break
             
-            # Limit text length for safety
-            if len(full_text) > self.max_text_length:
-                full_text = full_text[:self.max_text_length] + "\n\n[Text truncated due to length limit]"
+            full_text = text_content.getvalue()
             
-            return {
+            result = {
                 'text': full_text,
                 'page_count': page_count,
                 'character_count': len(full_text),
                 'success': True
             }
+            self._write_cache(cache_path, result)
+            return result
         
         except Exception as e:
             logger.error(f"Error extracting text: {str(e)}")
@@ -67,44 +338,18 @@ class PDFProcessor:
                 'success': False
             }
     
-    def extract_metadata(self, pdf_path):
+    def extract_metadata(self, pdf_path, force_refresh=False):
         """Extract metadata from PDF"""
         try:
-            metadata = {}
-            
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                
-                # Basic info
-                metadata['page_count'] = len(pdf_reader.pages)
-                metadata['file_size'] = os.path.getsize(pdf_path)
-                
-                # PDF metadata
-                if pdf_reader.metadata:
-                    pdf_metadata = pdf_reader.metadata
-                    metadata['title'] = pdf_metadata.get('/Title', 'N/A')
-                    metadata['author'] = pdf_metadata.get('/Author', 'N/A')
-                    metadata['subject'] = pdf_metadata.get('/Subject', 'N/A')
-                    metadata['creator'] = pdf_metadata.get('/Creator', 'N/A')
-                    metadata['producer'] = pdf_metadata.get('/Producer', 'N/A')
-                    metadata['creation_date'] = pdf_metadata.get('/CreationDate', 'N/A')
-                    metadata['modification_date'] = pdf_metadata.get('/ModDate', 'N/A')
-                else:
-                    metadata['title'] = 'N/A'
-                    metadata['author'] = 'N/A'
-                    metadata['subject'] = 'N/A'
-                    metadata['creator'] = 'N/A'
-                    metadata['producer'] = 'N/A'
-                    metadata['creation_date'] = 'N/A'
-                    metadata['modification_date'] = 'N/A'
-                
-                # Additional info
-                metadata['encrypted'] = pdf_reader.is_encrypted
-                
-                return {
-                    'metadata': metadata,
-                    'success': True
-                }
+            if force_refresh:
+                metadata = _read_metadata(pdf_path)
+            else:
+                st = os.stat(pdf_path)
+                metadata = _metadata_cached(pdf_path, st.st_mtime_ns, st.st_size)
+            return {
+                'metadata': dict(metadata),
+                'success': True
+            }
         
         except Exception as e:
             logger.error(f"Error extracting metadata: {str(e)}")
@@ -116,6 +361,9 @@ class PDFProcessor:
     def split_pages(self, pdf_path, output_dir):
         """Split PDF into individual pages"""
         try:
+            if fitz is not None:
+                return self._split_pages_fitz(pdf_path, output_dir)
+            
             with open(pdf_path, 'rb') as file:
                 pdf_reader = PyPDF2.PdfReader(file)
                 page_count = len(pdf_reader.pages)
@@ -126,31 +374,19 @@ class PDFProcessor:
                         'success': False
                     }
                 
-                output_files = []
                 base_name = os.path.splitext(os.path.basename(pdf_path))[0]
-                
-                for page_num in range(page_count):
-                    pdf_writer = PyPDF2.PdfWriter()
-                    pdf_writer.add_page(pdf_reader.pages[page_num])
-                    
-                    output_filename = f"{base_name}_page_{page_num + 1}.pdf"
-                    output_path = os.path.join(output_dir, output_filename)
-                    
-                    with open(output_path, 'wb') as output_file:
-                        pdf_writer.write(output_file)
-                    
-                    output_files.append(output_filename)
-                
-                # Create ZIP file with all pages
                 zip_filename = f"{base_name}_split_pages.zip"
                 zip_path = os.path.join(output_dir, zip_filename)
                 
-                with zipfile.ZipFile(zip_path, 'w') as zipf:
-                    for filename in output_files:
-                        file_path = os.path.join(output_dir, filename)
-                        zipf.write(file_path, filename)
-                        # Remove individual PDF files after adding to ZIP
-                        os.remove(file_path)
+                # Serialize each page in memory and add it to the ZIP directly, no temp files
+                with _open_buffered(zip_path) as zip_file, zipfile.ZipFile(zip_file, 'w', zipfile.ZIP_STORED) as zipf:
+                    for page_num in range(page_count):
+                        pdf_writer = PyPDF2.PdfWriter()
+                        pdf_writer.add_page(pdf_reader.pages[page_num])
+                        
+                        page_buffer = BytesIO()
+                        pdf_writer.write(page_buffer)
+                        zipf.writestr(f"{base_name}_page_{page_num + 1}.pdf", page_buffer.getbuffer())
                 
                 return {
                     'zip_file': zip_filename,
@@ -165,59 +401,136 @@ class PDFProcessor:
                 'success': False
             }
     
+    def _split_pages_fitz(self, pdf_path, output_dir):
+        """split_pages using PyMuPDF"""
+        with fitz.open(pdf_path) as doc:
+            page_count = doc.page_count
+            if page_count > self.max_pages:
+                return {
+                    'error': f'PDF has too many pages ({page_count}). Maximum allowed: {self.max_pages}',
+                    'success': False
+                }
+            
+            base_name = os.path.splitext(os.path.basename(pdf_path))[0]
+            zip_filename = f"{base_name}_split_pages.zip"
+            zip_path = os.path.join(output_dir, zip_filename)
+            
+            # Page PDFs are already compressed; store them and write the archive in large blocks
+            with _open_buffered(zip_path) as zip_file, zipfile.ZipFile(zip_file, 'w', zipfile.ZIP_STORED) as zipf:
+                for page_num in range(page_count):
+                    with fitz.open() as page_doc:
+                        page_doc.insert_pdf(doc, from_page=page_num, to_page=page_num)
+                        zipf.writestr(f"{base_name}_page_{page_num + 1}.pdf", page_doc.tobytes(garbage=1))
+        
+        return {
+            'zip_file': zip_filename,
+            'page_count': page_count,
+            'success': True
+        }
+    
     def merge_pdfs(self, pdf_paths, output_dir):
         """Merge multiple PDFs into one"""
         try:
-            pdf_writer = PyPDF2.PdfWriter()
-            total_pages = 0
-            source_files = []
-            
+            with _merge_slots:
+                return self._merge_pdfs(pdf_paths, output_dir)
+        
+        except Exception as e:
+            logger.error(f"Error merging PDFs: {str(e)}")
+            return {
+                'error': f'Error merging PDFs: {str(e)}',
+                'success': False
+            }
+    
+    def _merge_pdfs(self, pdf_paths, output_dir):
+        """merge_pdfs body, run while holding a merge slot"""
+        if fitz is not None:
+            return self._merge_pdfs_fitz(pdf_paths, output_dir)
+        
+        pdf_writer = PyPDF2.PdfWriter()
+        total_pages = 0
+        source_files = []
+        
+        for pdf_path in pdf_paths:
+            with open(pdf_path, 'rb') as file:
+                pdf_reader = PyPDF2.PdfReader(file)
+                page_count = len(pdf_reader.pages)
+                
+                if total_pages + page_count > self.max_pages:
+                    return {
+                        'error': f'Total pages would exceed limit ({self.max_pages})',
+                        'success': False
+                    }
+                
+                for page_num in range(page_count):
+                    pdf_writer.add_page(pdf_reader.pages[page_num])
+                
+                total_pages += page_count
+                source_files.append(os.path.basename(pdf_path))
+        
+        # Create output filename
+        output_filename = f"merged_pdf_{len(pdf_paths)}_files.pdf"
+        output_path = os.path.join(output_dir, output_filename)
+        
+        with _open_buffered(output_path) as output_file:
+            pdf_writer.write(output_file)
+        
+        # Clean up source files
+        for pdf_path in pdf_paths:
+            if os.path.exists(pdf_path):
+                os.remove(pdf_path)
+        
+        return {
+            'output_file': output_filename,
+            'total_pages': total_pages,
+            'source_files': source_files,
+            'success': True
+        }
+
+    def _merge_pdfs_fitz(self, pdf_paths, output_dir):
+        """merge_pdfs using PyMuPDF"""
+        total_pages = 0
+        source_files = []
+        
+        with fitz.open() as merged:
             for pdf_path in pdf_paths:
-                with open(pdf_path, 'rb') as file:
-                    pdf_reader = PyPDF2.PdfReader(file)
-                    page_count = len(pdf_reader.pages)
-                    
-                    if total_pages + page_count > self.max_pages:
+                with fitz.open(pdf_path) as doc:
+                    if total_pages + doc.page_count > self.max_pages:
                         return {
                             'error': f'Total pages would exceed limit ({self.max_pages})',
                             'success': False
                         }
-                    
-                    for page_num in range(page_count):
-                        pdf_writer.add_page(pdf_reader.pages[page_num])
-                    
-                    total_pages += page_count
+                    merged.insert_pdf(doc)
+                    total_pages += doc.page_count
                     source_files.append(os.path.basename(pdf_path))
             
-            # Create output filename
             output_filename = f"merged_pdf_{len(pdf_paths)}_files.pdf"
-            output_path = os.path.join(output_dir, output_filename)
-            
-            with open(output_path, 'wb') as output_file:
-                pdf_writer.write(output_file)
-            
-            # Clean up source files
-            for pdf_path in pdf_paths:
-                if os.path.exists(pdf_path):
-                    os.remove(pdf_path)
-            
-            return {
-                'output_file': output_filename,
-                'total_pages': total_pages,
-                'source_files': source_files,
-                'success': True
-            }
+            merged.save(os.path.join(output_dir, output_filename), garbage=1)
         
-        except Exception as e:
-            logger.error(f"Error merging PDFs: {str(e)}")
-            return {
-                'error': f'Error merging PDFs: {str(e)}',
-                'success': False
-            }
+        # Clean up source files
+        for pdf_path in pdf_paths:
+            if os.path.exists(pdf_path):
+                os.remove(pdf_path)
+        
+        return {
+            'output_file': output_filename,
+            'total_pages': total_pages,
+            'source_files': source_files,
+            'success': True
+        }
 
     def compress_pdf(self, pdf_path, output_dir):
         """Compress PDF by reducing quality of images and removing metadata"""
         try:
+            output_filename = f"compressed_{os.path.basename(pdf_path)}"
+            if fitz is not None:
+                with fitz.open(pdf_path) as doc:
+                    # Drop unused/duplicate objects and deflate every stream, images and fonts included
+                    doc.save(os.path.join(output_dir, output_filename), garbage=4, deflate=True, deflate_images=True, deflate_fonts=True, clean=True)
+                return {
+                    'output_file': output_filename,
+                    'success': True
+                }
+            
             from PyPDF2 import PdfReader, PdfWriter
             reader = PdfReader(pdf_path)
             writer = PdfWriter()
@@ -226,10 +539,9 @@ class PDFProcessor:
                 page.compress_content_streams()
                 writer.add_page(page)
 
-            output_filename = f"compressed_{os.path.basename(pdf_path)}"
             output_path = os.path.join(output_dir, output_filename)
 
-            with open(output_path, "wb") as f:
+            with _open_buffered(output_path) as f:
                 writer.write(f)
 
             return {
@@ -255,7 +567,7 @@ class PDFProcessor:
             output_filename = f"protected_{os.path.basename(pdf_path)}"
             output_path = os.path.join(output_dir, output_filename)
 
-            with open(output_path, "wb") as f:
+            with _open_buffered(output_path) as f:
                 writer.write(f)
 
             return {
@@ -269,6 +581,18 @@ class PDFProcessor:
     def rotate_pdf(self, pdf_path, output_dir, rotation=90):
         """Rotate all pages in a PDF"""
         try:
+            if fitz is not None:
+                output_filename = f"rotated_{os.path.basename(pdf_path)}"
+                with fitz.open(pdf_path) as doc:
+                    for page in doc:
+                        # Relative to the current rotation, like PyPDF2's page.rotate()
+                        page.set_rotation((page.rotation + rotation) % 360)
+                    doc.save(os.path.join(output_dir, output_filename))
+                return {
+                    'output_file': output_filename,
+                    'success': True
+                }
+            
             from PyPDF2 import PdfReader, PdfWriter
             reader = PdfReader(pdf_path)
             writer = PdfWriter()
@@ -280,7 +604,7 @@ class PDFProcessor:
             output_filename = f"rotated_{os.path.basename(pdf_path)}"
             output_path = os.path.join(output_dir, output_filename)
 
-            with open(output_path, "wb") as f:
+            with _open_buffered(output_path) as f:
                 writer.write(f)
 
             return {